@@ -0,0 +1,46 @@
+#!/usr/bin/env bash
+
+
+format_duration() {
+    declare desc="Format a number of seconds as HH:MM:SS."
+    local seconds="${1}"
+    printf '%02d:%02d:%02d' $((seconds / 3600)) $((seconds % 3600 / 60)) $((seconds % 60))
+}
+
+format_throughput() {
+    declare desc="Format bytes processed in a number of seconds as MB/s."
+    local bytes="${1}"
+    local seconds="${2}"
+    awk -v bytes="${bytes}" -v seconds="${seconds}" \
+        'BEGIN { if (seconds < 1) seconds = 1; printf "%.1f MB/s", bytes / seconds / 1048576 }'
+}
+
+backup_info() {
+    declare desc="Print a value of a backup's info file. \$\"\{1\}\": backup directory, \$\"\{2\}\": key."
+    local backup_path="${1}"
+    local key="${2}"
+    local info_path="${backup_path}/${BACKUP_INFO_FILENAME}"
+    if [[ -f "${info_path}" ]]; then
+        sed -n "s/^${key}=//p" "${info_path}"
+    fi
+}
+
+write_checksums() {
+    declare desc="Write the checksums of every file of a backup directory."
+    local backup_path="${1}"
+    (
+        cd "${backup_path}"
+        find . -type f ! -name "${BACKUP_CHECKSUMS_FILENAME}" ! -name "${BACKUP_INFO_FILENAME}" -printf '%P\0' \
+            | sort -z \
+            | xargs -0 sha256sum > "${BACKUP_CHECKSUMS_FILENAME}"
+    )
+}
+
+verify_checksums() {
+    declare desc="Check the files of a backup directory against its checksums."
+    local backup_path="${1}"
+    (
+        cd "${backup_path}"
+        [[ -f "${BACKUP_CHECKSUMS_FILENAME}" ]] && sha256sum --check --quiet --strict "${BACKUP_CHECKSUMS_FILENAME}"
+    )
+}
@@ -3,3 +3,10 @@
 
 BACKUP_DIR_PATH='/backups'
 BACKUP_FILE_PREFIX='backup'
+BACKUP_CHECKSUMS_FILENAME='checksums.sha256'
+BACKUP_INFO_FILENAME='backup.info'
+
+# Parallel pg_dump / pg_restore jobs and pg_dump compression level (0-9).
+BACKUP_JOBS="${BACKUP_JOBS:-$(nproc)}"
+BACKUP_COMPRESSION="${BACKUP_COMPRESSION:-6}"
+RESTORE_JOBS="${RESTORE_JOBS:-$(nproc)}"
@@ -24,6 +24,23 @@ DATABASES = {
 }
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
+# Read replicas, named replica_0, replica_1... Locally a replica URL can
+# point to the default database itself.
+DATABASE_REPLICA_URLS = env.list('DATABASE_REPLICA_URLS', default=[])
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES['replica_{}'.format(index)] = env.db_url_config(url)
+    DATABASES['replica_{}'.format(index)]['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['cride.utils.routers.ReplicaRouter']
+# pool_* options in a database URL switch it to the pooled backend.
+for database in DATABASES.values():
+    if any(option.startswith('pool_') for option in database.get('OPTIONS', {})):
+        database['ENGINE'] = 'cride.utils.backends.postgresql_pool'
+# Models always read from the primary, whatever the request.
+REPLICA_EXCLUDED_MODELS = ['authtoken.token']
+# Seconds a client keeps reading from the primary after a write.
+REPLICA_PIN_TIMEOUT = env.int('REPLICA_PIN_TIMEOUT', default=5)
+REPLICA_PIN_COOKIE = 'primary_pin'
+
 # URLs
 ROOT_URLCONF = 'config.urls'
 
@@ -32,6 +49,8 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Users & Authentication
 AUTH_USER_MODEL = 'users.User'
+VERIFICATION_CONSUMED_CACHE_TIMEOUT = env.int('VERIFICATION_CONSUMED_CACHE_TIMEOUT', default=60 * 60)
+AUTH_TOKEN_CACHE_TIMEOUT = env.int('AUTH_TOKEN_CACHE_TIMEOUT', default=60 * 5)
 
 # Apps
 DJANGO_APPS = [
@@ -41,6 +60,7 @@ DJANGO_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.admin',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -50,17 +70,21 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     'cride.users.apps.UsersAppConfig',
     'cride.circles.apps.CirclesAppConfig',
+    'cride.utils.apps.UtilsAppConfig',
 ]
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 # Passwords
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'cride.users.hashers.TunedArgon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
     'django.contrib.auth.hashers.BCryptPasswordHasher',
 ]
+ARGON2_TIME_COST = env.int('ARGON2_TIME_COST', default=2)
+ARGON2_MEMORY_COST = env.int('ARGON2_MEMORY_COST', default=512)
+ARGON2_PARALLELISM = env.int('ARGON2_PARALLELISM', default=2)
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -78,15 +102,29 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Middlewares
 MIDDLEWARE = [
+    'cride.utils.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'cride.utils.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cride.utils.middleware.ReplicaRoutingMiddleware',
 ]
 
+# Metrics
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=['127.0.0.1'])
+QUERY_BUDGETS = {
+    'CircleViewSet.list': 2,
+    'CircleViewSet.retrieve': 3,
+    'UserViewSet.retrieve': 4,
+    'UserViewSet.login': 7,
+    'UserViewSet.signup': 6,
+    'UserViewSet.verify': 1,
+}
+
 # Static files
 STATIC_ROOT = str(ROOT_DIR('staticfiles'))
 STATIC_URL = '/static/'
@@ -102,6 +140,15 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR('media'))
 MEDIA_URL = '/media/'
 
+# Images
+IMAGE_STAGING_ROOT = env('IMAGE_STAGING_ROOT', default=str(ROOT_DIR('staging')))
+IMAGE_MAX_SIZE = env.int('IMAGE_MAX_SIZE', default=1600)
+IMAGE_QUALITY = env.int('IMAGE_QUALITY', default=85)
+IMAGE_VARIANTS = {
+    'small': (128, 128),
+    'medium': (512, 512),
+}
+
 # Templates
 TEMPLATES = [
     {
@@ -137,6 +184,8 @@ X_FRAME_OPTIONS = 'DENY'
 
 # Email
 EMAIL_BACKEND = env('DJANGO_EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+CONFIRMATION_EMAIL_BATCH_WINDOW = env.int('CONFIRMATION_EMAIL_BATCH_WINDOW', default=5)
+CONFIRMATION_EMAIL_BATCH_SIZE = env.int('CONFIRMATION_EMAIL_BATCH_SIZE', default=100)
 
 # Admin
 ADMIN_URL = 'admin/'
@@ -144,28 +193,103 @@ ADMINS = [
     ("""Pablo Trinidad""", 'pablotrinidad@ciencias.unam.mx'),
 ]
 MANAGERS = ADMINS
+# Unfiltered changelists of bigger tables show the planner's estimate.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = env.int('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000)
+
+# Redis
+REDIS_URL = env('REDIS_URL', default='redis://redis:6379/0')
 
 # Celery
 INSTALLED_APPS += ['cride.taskapp.celery.CeleryAppConfig']
 if USE_TZ:
     CELERY_TIMEZONE = TIME_ZONE
 CELERY_BROKER_URL = env('CELERY_BROKER_URL')
-CELERY_RESULT_BACKEND = CELERY_BROKER_URL
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
+# Results are only stored for tasks asking for them, away from the broker if set.
+CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default=CELERY_BROKER_URL)
+CELERY_RESULT_EXPIRES = 60 * 60
+CELERY_TASK_IGNORE_RESULT = True
+# JSON without whitespace, see cride.taskapp.celery. Plain JSON messages are still accepted.
+CELERY_ACCEPT_CONTENT = ['compactjson', 'json']
+CELERY_TASK_SERIALIZER = 'compactjson'
+CELERY_RESULT_SERIALIZER = 'compactjson'
+# Every queue has its own workers (see compose/production/django/celery/worker/start)
+# so a burst of one kind of task never delays the others. Within a queue,
+# tasks are taken by priority: Redis keeps one list per priority step and
+# 0 comes first. Flushes that deliver what's been batched go ahead of the
+# tasks feeding the batch.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_DEFAULT_PRIORITY = 6
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': [0, 3, 6, 9],
+    'queue_order_strategy': 'priority',
+}
+CELERY_TASK_ROUTES = {
+    'send_confirmation_email': {'queue': 'email', 'priority': 3},
+    'flush_confirmation_emails': {'queue': 'email', 'priority': 0},
+    'process_image': {'queue': 'media', 'priority': 6},
+    'flush_counters': {'queue': 'stats', 'priority': 0},
+    'recompute_reputation': {'queue': 'maintenance', 'priority': 9},
+}
+TASK_QUEUES = ['default', 'email', 'media', 'stats', 'maintenance']
+# Worker processes reserve one task at a time and acknowledge it once
+# done: a long task doesn't hold back the ones queued behind it and the
+# tasks of a lost worker are delivered again, so every task must be safe
+# to run twice.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
 CELERYD_TASK_TIME_LIMIT = 5 * 60
 CELERYD_TASK_SOFT_TIME_LIMIT = 60
+CELERY_BEAT_SCHEDULE = {
+    'flush-counters': {
+        'task': 'flush_counters',
+        'schedule': env.int('COUNTERS_FLUSH_INTERVAL', default=30),
+    },
+    'recompute-reputation': {
+        'task': 'recompute_reputation',
+        'schedule': env.int('REPUTATION_INTERVAL', default=60 * 60),
+    },
+}
 
 
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'cride.utils.renderers.FastJSONRenderer',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'cride.users.authentication.CachedTokenAuthentication'
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 3,
-}
\ No newline at end of file
+}
+
+# Responses smaller than this are not worth compressing.
+GZIP_MIN_LENGTH = env.int('GZIP_MIN_LENGTH', default=1024)
+
+# Search
+SEARCH_RESULTS_LIMIT = env.int('SEARCH_RESULTS_LIMIT', default=20)
+
+# Circles
+CIRCLE_LIST_CACHE_TIMEOUT = env.int('CIRCLE_LIST_CACHE_TIMEOUT', default=60 * 15)
+CIRCLE_LIST_MAX_PAGE_SIZE = env.int('CIRCLE_LIST_MAX_PAGE_SIZE', default=100)
+MEMBERSHIP_MAP_CACHE_TIMEOUT = env.int('MEMBERSHIP_MAP_CACHE_TIMEOUT', default=60 * 5)
+MEMBERSHIP_IMPORT_BATCH_SIZE = env.int('MEMBERSHIP_IMPORT_BATCH_SIZE', default=1000)
+INVITATION_CODE_LENGTH = 10
+
+# Leaderboards
+LEADERBOARD_MAX_LIMIT = env.int('LEADERBOARD_MAX_LIMIT', default=100)
+LEADERBOARD_REBUILD_BATCH_SIZE = env.int('LEADERBOARD_REBUILD_BATCH_SIZE', default=5000)
+LEADERBOARD_REBUILD_TIME_LIMIT = env.int('LEADERBOARD_REBUILD_TIME_LIMIT', default=30 * 60)
+
+# Counters
+COUNTERS = {
+    'circles.circle': ('rides_taken', 'rides_offered'),
+    'circles.membership': ('rides_taken', 'rides_offered'),
+    'users.profile': ('rides_taken', 'rides_offered'),
+}
+COUNTERS_FLUSH_BATCH_SIZE = env.int('COUNTERS_FLUSH_BATCH_SIZE', default=500)
+
+# Reputation
+REPUTATION_BATCH_SIZE = env.int('REPUTATION_BATCH_SIZE', default=5000)
+REPUTATION_TIME_LIMIT = env.int('REPUTATION_TIME_LIMIT', default=30 * 60)
@@ -8,9 +8,10 @@ SECRET_KEY = env('DJANGO_SECRET_KEY')
 ALLOWED_HOSTS = env.list('DJANGO_ALLOWED_HOSTS', default=['comparteride.com'])
 
 # Databases
-DATABASES['default'] = env.db('DATABASE_URL')  # NOQA
-DATABASES['default']['ATOMIC_REQUESTS'] = True  # NOQA
 DATABASES['default']['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=60)  # NOQA
+for alias in DATABASES:  # NOQA
+    if alias.startswith('replica_'):
+        DATABASES[alias]['CONN_MAX_AGE'] = DATABASES['default']['CONN_MAX_AGE']  # NOQA
 
 # Cache
 CACHES = {
@@ -86,7 +87,7 @@ ANYMAIL = {
 INSTALLED_APPS += ['gunicorn']  # noqa F405
 
 # WhiteNoise
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')  # noqa F405
+MIDDLEWARE.insert(2, 'whitenoise.middleware.WhiteNoiseMiddleware')  # noqa F405
 
 
 # Logging
@@ -122,6 +123,11 @@ LOGGING = {
         },
     },
     'loggers': {
+        'cride': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False
+        },
         'django.request': {
             'handlers': ['mail_admins'],
             'level': 'ERROR',
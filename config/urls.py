@@ -5,9 +5,15 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.contrib import admin
 
+# Metrics
+from cride.utils.views import metrics
+
 urlpatterns = [
     # Django Admin
     path(settings.ADMIN_URL, admin.site.urls),
+
+    # Metrics
+    path('metrics/', metrics, name='metrics'),
     
     path('', include(('cride.circles.urls', 'circles'), namespace='circle')),
     path('', include(('cride.users.urls', 'users'), namespace='users')),
@@ -4,11 +4,14 @@
 from django.contrib import admin
 
 # Model
-from cride.circles.models import Circle
+from cride.circles.models import Circle, Invitation, Membership
+
+# Utilities
+from cride.utils.admin import IndexedSearchAdminMixin, LargeTableAdminMixin
 
 
 @admin.register(Circle)
-class CircleAdmin(admin.ModelAdmin):
+class CircleAdmin(LargeTableAdminMixin, IndexedSearchAdminMixin, admin.ModelAdmin):
     """Circle admin."""
 
     list_display = (
@@ -19,9 +22,34 @@ class CircleAdmin(admin.ModelAdmin):
         'is_limited',
         'members_limit'
     )
-    search_fields = ('slug_name', 'name')
+    search_fields = ('slug_name', 'name', 'about')
     list_filter = (
         'is_public',
         'verified',
         'is_limited'
     )
+    ordering = ('-pk',)
+
+
+@admin.register(Membership)
+class MembershipAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Membership admin."""
+
+    list_display = ('user', 'circle', 'is_admin', 'is_active', 'rides_taken', 'rides_offered')
+    list_select_related = ('user', 'circle')
+    list_filter = ('is_admin', 'is_active')
+    raw_id_fields = ('user', 'profile', 'invited_by')
+    autocomplete_fields = ('circle',)
+    ordering = ('-pk',)
+
+
+@admin.register(Invitation)
+class InvitationAdmin(admin.ModelAdmin):
+    """Invitation admin."""
+
+    list_display = ('code', 'circle', 'issued_by', 'used', 'used_by', 'used_at')
+    list_select_related = ('circle', 'issued_by', 'used_by')
+    list_filter = ('used',)
+    search_fields = ('code',)
+    raw_id_fields = ('circle', 'issued_by', 'used_by')
+    ordering = ('-pk',)
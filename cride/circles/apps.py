@@ -9,3 +9,7 @@ class CirclesAppConfig(AppConfig):
 
     name = 'cride.circles'
     verbose_name = 'Circles'
+
+    def ready(self):
+        """Register signal handlers."""
+        import cride.circles.signals  # noqa F401
@@ -0,0 +1,131 @@
+"""Circles cache."""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Models
+from cride.circles.models import Membership
+
+
+LIST_VERSION_KEY = 'circles:list:version'
+LIST_PAGE_KEY = 'circles:list:v{version}:origin={origin}:page_size={page_size}:cursor={cursor}:fields={fieldset}'
+LIST_HITS_KEY = 'circles:list:hits'
+LIST_MISSES_KEY = 'circles:list:misses'
+MEMBERSHIP_MAP_KEY = 'circles:memberships:user={user_pk}'
+
+
+def _incr(key):
+    """Increment a counter, creating it when missing."""
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key was evicted between add() and incr().
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def get_list_version():
+    """Return the current version of the public circle list."""
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        cache.add(LIST_VERSION_KEY, 1, timeout=None)
+        version = cache.get(LIST_VERSION_KEY, 1)
+    return version
+
+
+def bump_list_version():
+    """Invalidate every cached page of the public circle list."""
+    return _incr(LIST_VERSION_KEY)
+
+
+def get_list_page_key(page_size, cursor, fieldset='', origin=''):
+    """Return the cache key of a public circle list page.
+
+    Pages hold absolute next/previous links, so they are cached per
+    `origin` (scheme and host) they were requested on. `fieldset`
+    identifies the sparse fieldset requested, if any.
+
+    The key holds the current list version: read it once per request
+    and use it both to look the page up and to store it, so a page
+    built before a bump is never stored under the new version.
+    """
+    return LIST_PAGE_KEY.format(
+        version=get_list_version(),
+        origin=origin,
+        page_size=page_size,
+        cursor=cursor or '',
+        fieldset=fieldset
+    )
+
+
+def get_list_page(key):
+    """Return a cached page of the public circle list or None."""
+    data = cache.get(key)
+    _incr(LIST_MISSES_KEY if data is None else LIST_HITS_KEY)
+    return data
+
+
+def set_list_page(key, data):
+    """Store a serialized page of the public circle list."""
+    cache.set(key, data, timeout=settings.CIRCLE_LIST_CACHE_TIMEOUT)
+
+
+def get_list_stats():
+    """Return the hit/miss counters of the public circle list cache, by result label.
+
+    Collected by the cride_circle_list_cache_requests metric.
+    """
+    stats = cache.get_many([LIST_HITS_KEY, LIST_MISSES_KEY])
+    return {
+        (('result', 'hit'),): stats.get(LIST_HITS_KEY, 0),
+        (('result', 'miss'),): stats.get(LIST_MISSES_KEY, 0),
+    }
+
+
+def get_membership_map(user):
+    """Return the memberships of a user indexed by circle id.
+
+    Every value holds the is_admin and is_active flags of the
+    membership. The map is memoized on the user instance, so it is
+    read from the cache at most once per request. Maps are built from
+    the primary: one read from a lagging replica right after a commit
+    would keep a demoted admin in charge until it expires.
+    """
+    if hasattr(user, '_membership_map'):
+        return user._membership_map
+
+    key = MEMBERSHIP_MAP_KEY.format(user_pk=user.pk)
+    membership_map = cache.get(key)
+    if membership_map is None:
+        memberships = Membership.objects.using('default').filter(user=user).values_list(
+            'circle_id', 'is_admin', 'is_active'
+        )
+        membership_map = {
+            circle_id: {'is_admin': is_admin, 'is_active': is_active}
+            for circle_id, is_admin, is_active in memberships
+        }
+        cache.set(key, membership_map, timeout=settings.MEMBERSHIP_MAP_CACHE_TIMEOUT)
+
+    user._membership_map = membership_map
+    return membership_map
+
+
+def invalidate_membership_map(user_pk):
+    """Drop the cached membership map of a user."""
+    invalidate_membership_maps([user_pk])
+
+
+def invalidate_membership_maps(user_pks):
+    """Drop the cached membership maps of several users at once.
+
+    Maps are dropped right away, so the current transaction reads its
+    own changes, and again once it commits: a request reading the old
+    rows in between would cache them back, and keep a demoted admin
+    in charge until the map expires.
+    """
+    keys = [MEMBERSHIP_MAP_KEY.format(user_pk=user_pk) for user_pk in user_pks]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,123 @@
+"""Circle members bulk import."""
+
+# Django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+# Models
+from cride.circles.models import Circle, Membership
+from cride.users.models import User
+
+# Cache
+from cride.circles.cache import invalidate_membership_maps
+
+# Leaderboards
+from cride.utils import leaderboards
+
+# Utilities
+import csv
+import io
+import json
+
+
+CREATED = 'created'
+ALREADY_MEMBER = 'already_member'
+DUPLICATED = 'duplicated'
+NOT_FOUND = 'not_found'
+LIMIT_REACHED = 'limit_reached'
+
+
+def parse_members(content, file_format):
+    """Return the user identifiers (usernames or emails) of an import file.
+
+    CSV files must have a `username` or `email` column. JSON files must
+    hold a list of identifiers or of objects with one of those keys.
+    """
+    if file_format == 'csv':
+        rows = csv.DictReader(io.StringIO(content))
+    elif file_format == 'json':
+        rows = json.loads(content)
+        if not isinstance(rows, list):
+            raise ValueError('JSON imports must be a list of users.')
+    else:
+        raise ValueError('Unsupported format {}.'.format(file_format))
+    return [get_identifier(row) for row in rows]
+
+
+def get_identifier(row):
+    """Return the username or email of a parsed row."""
+    if isinstance(row, str):
+        return row.strip()
+    if isinstance(row, dict):
+        identifier = row.get('username') or row.get('email') or ''
+        if isinstance(identifier, str):
+            return identifier.strip()
+    raise ValueError('Invalid member {!r}.'.format(row))
+
+
+def import_members(circle, identifiers, invited_by=None):
+    """Add the given users to a circle.
+
+    Users are resolved with a single query and missing memberships
+    are created with bulk_create in chunks, then ranked in the circle's
+    members leaderboard once committed. The circle row is locked
+    for the whole import so concurrent imports can't exceed its member
+    limit. Return one result per identifier, in order, once every
+    chunk is written: the lock and the transaction are not held while
+    the caller sends the results.
+    """
+    with transaction.atomic():
+        circle = Circle.objects.select_for_update().get(pk=circle.pk)
+
+        users = User.objects.filter(
+            Q(username__in=identifiers) | Q(email__in=identifiers)
+        ).select_related('profile')
+        users_by_identifier = {}
+        for user in users:
+            users_by_identifier[user.username] = user
+            users_by_identifier[user.email] = user
+
+        members = set(Membership.objects.filter(
+            circle=circle,
+            user__in=users
+        ).values_list('user_id', flat=True))
+
+        available = None
+        if circle.is_limited:
+            active_members = Membership.objects.filter(circle=circle, is_active=True).count()
+            available = max(circle.members_limit - active_members, 0)
+
+        imported = set()
+        results = []
+        batch_size = settings.MEMBERSHIP_IMPORT_BATCH_SIZE
+        for start in range(0, len(identifiers), batch_size):
+            memberships = []
+            for row, identifier in enumerate(identifiers[start:start + batch_size], start=start + 1):
+                user = users_by_identifier.get(identifier)
+                if user is None or not hasattr(user, 'profile'):
+                    status = NOT_FOUND
+                elif user.pk in imported:
+                    status = DUPLICATED
+                elif user.pk in members:
+                    status = ALREADY_MEMBER
+                elif available is not None and available <= 0:
+                    status = LIMIT_REACHED
+                else:
+                    status = CREATED
+                    imported.add(user.pk)
+                    if available is not None:
+                        available -= 1
+                    memberships.append(Membership(
+                        user=user,
+                        profile=user.profile,
+                        circle=circle,
+                        invited_by=invited_by
+                    ))
+                results.append({'row': row, 'user': identifier, 'status': status})
+
+            Membership.objects.bulk_create(memberships)
+            invalidate_membership_maps([membership.user_id for membership in memberships])
+            # bulk_create() skips the post_save receivers ranking new members.
+            transaction.on_commit(lambda memberships=memberships: leaderboards.sync_many(memberships))
+    return results
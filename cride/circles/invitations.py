@@ -0,0 +1,120 @@
+"""Circle invitations.
+
+Members get one pre-generated code per invitation they are granted.
+Redeeming a code is a conditional UPDATE on its row: concurrent
+redemptions of the same code block on that row only and all but one
+update nothing, so a code can't be spent twice.
+"""
+
+# Django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Models
+from cride.circles.models import Circle, Invitation, Membership
+from cride.users.models import User
+
+# Utilities
+import secrets
+
+
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+
+def generate_code():
+    """Return a random invitation code."""
+    return ''.join(secrets.choice(CODE_ALPHABET) for _ in range(settings.INVITATION_CODE_LENGTH))
+
+
+def create_codes(membership, count):
+    """Create `count` invitation codes issued by a member in one INSERT.
+
+    Codes colliding with existing ones are skipped by the INSERT and
+    generated again.
+    """
+    missing = count
+    while missing > 0:
+        codes = {generate_code() for _ in range(missing)}
+        Invitation.objects.bulk_create([
+            Invitation(code=code, issued_by_id=membership.user_id, circle_id=membership.circle_id)
+            for code in codes
+        ], ignore_conflicts=True)
+        missing -= Invitation.objects.filter(
+            issued_by_id=membership.user_id,
+            circle_id=membership.circle_id,
+            code__in=codes
+        ).count()
+
+
+def top_up_codes(membership):
+    """Create the codes missing for the remaining invitations of a member."""
+    unused = Invitation.objects.filter(
+        issued_by_id=membership.user_id,
+        circle_id=membership.circle_id,
+        used=False
+    ).count()
+    if membership.remaining_invitations > unused:
+        create_codes(membership, membership.remaining_invitations - unused)
+
+
+def redeem(code, user):
+    """Make a user join a circle with an invitation code.
+
+    The code is consumed, the inviter's counters updated and the
+    membership created, or reactivated if the user left the circle, in
+    a single transaction. Raise ValueError if the code can't be used;
+    nothing is changed then.
+    """
+    with transaction.atomic():
+        # Serializes the redemptions of this user only, so two codes of
+        # the same circle redeemed at once can't both add a membership.
+        User.objects.select_for_update().only('pk').get(pk=user.pk)
+
+        # Consumes the code, only locks its row.
+        used = Invitation.objects.filter(code=code, used=False).update(
+            used=True,
+            used_by=user,
+            used_at=timezone.now(),
+            modified=timezone.now()
+        )
+        if not used:
+            raise ValueError('Invalid or already used invitation code.')
+        invitation = Invitation.objects.select_related('circle').get(code=code)
+        circle = invitation.circle
+
+        membership = Membership.objects.filter(user=user, circle=circle).order_by('-is_active', '-pk').first()
+        if membership is not None and membership.is_active:
+            raise ValueError('You are already a member of this circle.')
+
+        spent = Membership.objects.filter(
+            user_id=invitation.issued_by_id,
+            circle=circle,
+            is_active=True,
+            remaining_invitations__gt=0
+        ).update(
+            remaining_invitations=F('remaining_invitations') - 1,
+            used_invitations=F('used_invitations') + 1
+        )
+        if not spent:
+            raise ValueError('The invitation is no longer valid.')
+
+        if circle.is_limited:
+            # Serializes joins to this circle only, to respect its limit.
+            circle = Circle.objects.select_for_update().get(pk=circle.pk)
+            members = Membership.objects.filter(circle=circle, is_active=True).count()
+            if members >= circle.members_limit:
+                raise ValueError('Circle has reached its member limit.')
+
+        if membership is None:
+            return Membership.objects.create(
+                user=user,
+                profile=user.profile,
+                circle=circle,
+                invited_by_id=invitation.issued_by_id
+            )
+        membership.is_active = True
+        membership.invited_by_id = invitation.issued_by_id
+        membership.save()
+        return membership
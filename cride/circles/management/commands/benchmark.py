@@ -0,0 +1,90 @@
+"""Benchmark the API endpoints."""
+
+# Django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Models
+from cride.users.models import User
+
+# Utilities
+from cride.utils import benchmarks
+from cride.utils.seeding import seed
+import json
+import os
+
+
+class Command(BaseCommand):
+    """Measure the main endpoints and compare them with a baseline."""
+
+    help = (
+        'Measure latency percentiles, queries per request and peak RSS of the main endpoints '
+        'and fail when they regress against the baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', help='Defaults to every scenario.')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests run first.')
+        parser.add_argument('--url', help='Load a running server instead of using the test client.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Threads used along with --url.')
+        parser.add_argument('--seed-users', type=int, default=0, help='Seed this many users before running.')
+        parser.add_argument('--seed-circles', type=int, default=0, help='Seed this many circles before running.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(str(settings.ROOT_DIR), 'benchmarks', 'baseline.json')
+        )
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth, as a fraction.')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline.')
+        parser.add_argument('--force', action='store_true', help='Run even when DEBUG is off.')
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options['force']):
+            raise CommandError('Benchmarks create users and tokens; use --force to run them with DEBUG off.')
+
+        if options['seed_users'] or options['seed_circles']:
+            seed(options['seed_users'], options['seed_circles'], seed=options['seed'])
+
+        try:
+            scenarios = benchmarks.select(options['scenarios'])
+            sample = benchmarks.Sample()
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        if options['url']:
+            driver = benchmarks.HTTPDriver(options['url'], options['concurrency'])
+        else:
+            driver = benchmarks.ClientDriver()
+        try:
+            results = benchmarks.run(driver, scenarios, sample, options['requests'], options['warmup'])
+        except RuntimeError as error:
+            raise CommandError(str(error))
+        finally:
+            # Users created by the signup scenario.
+            User.objects.filter(username__startswith='bench', email__endswith='@bench.comparteride.com').delete()
+        results['driver'] = 'http' if options['url'] else 'client'
+
+        for line in benchmarks.format_results(results):
+            self.stdout.write(line)
+
+        path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS('Baseline saved to {}.'.format(path)))
+            return
+
+        if not os.path.exists(path):
+            self.stdout.write(self.style.WARNING('No baseline at {}, nothing to compare.'.format(path)))
+            return
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('driver') != results['driver']:
+            raise CommandError('The baseline was recorded with the {} driver.'.format(baseline.get('driver')))
+
+        regressions = benchmarks.compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against {}.'.format(path)))
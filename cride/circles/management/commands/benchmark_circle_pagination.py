@@ -0,0 +1,94 @@
+"""Benchmark circle list pagination."""
+
+# Django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# Models
+from cride.circles.models import Circle
+
+# Pagination
+from cride.circles.pagination import CircleKeysetPagination
+
+# Utilities
+import random
+import time
+
+
+class Command(BaseCommand):
+    """Compare offset and keyset pagination over the public circle list."""
+
+    help = 'Compare offset and keyset pagination of the public circle list at several depths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--circles', type=int, default=1000000, help='Number of circles the table must hold.')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--depths', type=int, nargs='+', default=[0, 1000, 10000, 100000, 500000, 900000])
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per depth, the best one is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--force', action='store_true', help='Run even when DEBUG is off.')
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options['force']):
+            raise CommandError('The benchmark creates circles; use --force to run it with DEBUG off.')
+
+        self.populate(options['circles'], options['seed'])
+        page_size = options['page_size']
+        paginator = CircleKeysetPagination()
+        queryset = Circle.objects.filter(is_public=True)
+
+        self.stdout.write('{:>10} {:>14} {:>14}'.format('depth', 'offset (ms)', 'keyset (ms)'))
+        for depth in options['depths']:
+            # Position of the row right before the page, as a client cursor would hold it.
+            position = None
+            if depth:
+                ordered = queryset.order_by(*paginator.ordering)
+                previous = ordered.values_list('rides_taken', 'rides_offered', 'id')[depth - 1:depth]
+                position = list(previous[0]) if previous else None
+
+            offset_page = queryset[depth:depth + page_size]
+            keyset_page = queryset.order_by(*paginator.ordering)
+            if position is not None:
+                keyset_page = keyset_page.filter(paginator.get_keyset_filter(paginator.ordering, position))
+            keyset_page = keyset_page[:page_size]
+
+            self.stdout.write('{:>10} {:>14.2f} {:>14.2f}'.format(
+                depth,
+                self.time_query(offset_page, options['repeat']),
+                self.time_query(keyset_page, options['repeat'])
+            ))
+
+    def populate(self, total, seed):
+        """Create circles until the table holds `total` rows."""
+        missing = total - Circle.objects.count()
+        if missing <= 0:
+            return
+
+        self.stdout.write('Creating {} circles...'.format(missing))
+        rng = random.Random(seed)
+        start = Circle.objects.count()
+        batch_size = 10000
+        for batch_start in range(0, missing, batch_size):
+            Circle.objects.bulk_create([
+                Circle(
+                    name='Benchmark circle {}'.format(number),
+                    slug_name='benchmark-{}'.format(number),
+                    about='Benchmark circle.',
+                    rides_taken=int(rng.paretovariate(1.2)),
+                    rides_offered=int(rng.paretovariate(1.2)),
+                )
+                for number in range(start + batch_start, start + min(batch_start + batch_size, missing))
+            ])
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE {}'.format(Circle._meta.db_table))
+
+    def time_query(self, queryset, repeat):
+        """Return the best evaluation time of a queryset in milliseconds."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
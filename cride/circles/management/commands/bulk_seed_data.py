@@ -0,0 +1,61 @@
+"""Bulk seed synthetic data."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Utilities
+from cride.utils.bulkload import load_fixture
+from cride.utils.leaderboards import rebuild
+from cride.utils.seeding import PASSWORD, bulk_seed
+import os
+import time
+
+
+class Command(BaseCommand):
+    """Stream synthetic users, circles and memberships into PostgreSQL with COPY."""
+
+    help = (
+        'Create millions of synthetic users with profiles, circles and memberships with COPY '
+        'from parallel workers. Fixtures given with --fixture are loaded first, one COPY per model.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--circles', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed and workers, same dataset.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            '--fixture', action='append', default=[],
+            help='JSON fixture to load with COPY instead of loaddata. Can be repeated.'
+        )
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Keep the secondary indexes during the load instead of building them afterwards.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for path in options['fixture']:
+            for label, count in load_fixture(path).items():
+                self.stdout.write('{}: {} {} objects loaded.'.format(path, count, label))
+
+        if not options['users'] and not options['circles']:
+            return
+        try:
+            users, circles, memberships = bulk_seed(
+                options['users'], options['circles'],
+                seed=options['seed'],
+                workers=options['workers'],
+                drop_indexes=not options['keep_indexes']
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        # COPY skips the signals ranking new rows.
+        if rebuild() is None:
+            self.stderr.write('A leaderboards rebuild was already running, run rebuild_leaderboards once it is done.')
+        self.stdout.write(self.style.SUCCESS(
+            '{} users, {} circles and {} memberships created in {:.1f} s.'.format(
+                users, circles, memberships, time.perf_counter() - started
+            )
+        ))
+        self.stdout.write('Every seeded user has the password {}.'.format(PASSWORD))
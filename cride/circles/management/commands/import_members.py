@@ -0,0 +1,58 @@
+"""Import circle members."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Models
+from cride.circles.models import Circle
+from cride.users.models import User
+
+# Imports
+from cride.circles.imports import CREATED, import_members, parse_members
+
+# Utilities
+from collections import Counter
+import json
+
+
+class Command(BaseCommand):
+    """Add the users listed in a CSV or JSON file to a circle."""
+
+    help = 'Add the users listed in a CSV or JSON file to a circle.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('circle', help='Slug name of the circle.')
+        parser.add_argument('path', help='CSV or JSON file with a username or email per member.')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension.')
+        parser.add_argument('--invited-by', help='Username recorded as the inviter of the new members.')
+
+    def handle(self, *args, **options):
+        try:
+            circle = Circle.objects.get(slug_name=options['circle'])
+        except Circle.DoesNotExist:
+            raise CommandError('Circle {} does not exist.'.format(options['circle']))
+
+        invited_by = None
+        if options['invited_by']:
+            try:
+                invited_by = User.objects.get(username=options['invited_by'])
+            except User.DoesNotExist:
+                raise CommandError('User {} does not exist.'.format(options['invited_by']))
+
+        file_format = options['format'] or ('json' if options['path'].endswith('.json') else 'csv')
+        with open(options['path'], encoding='utf-8') as members_file:
+            try:
+                identifiers = parse_members(members_file.read(), file_format)
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        totals = Counter()
+        for result in import_members(circle, identifiers, invited_by=invited_by):
+            totals[result['status']] += 1
+            if result['status'] != CREATED:
+                self.stdout.write(json.dumps(result))
+
+        self.stdout.write(self.style.SUCCESS('{} members added to {}.'.format(totals[CREATED], circle.slug_name)))
+        for status, total in sorted(totals.items()):
+            if status != CREATED:
+                self.stdout.write('{}: {}'.format(status, total))
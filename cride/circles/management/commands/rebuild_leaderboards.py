@@ -0,0 +1,26 @@
+"""Rebuild the leaderboards."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Utilities
+from cride.utils.leaderboards import rebuild
+import time
+
+
+class Command(BaseCommand):
+    """Recompute every Redis leaderboard from the database."""
+
+    help = 'Recompute the circles, circle members and reputation leaderboards from the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Rows read and written per round trip.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        totals = rebuild(options['batch_size'])
+        if totals is None:
+            raise CommandError('Another leaderboards rebuild is in progress.')
+        self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt in {:.1f} s.'.format(time.perf_counter() - started)))
+        for name, total in totals.items():
+            self.stdout.write('{}: {}'.format(name, total))
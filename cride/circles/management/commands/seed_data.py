@@ -0,0 +1,36 @@
+"""Seed synthetic data."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Utilities
+from cride.utils.leaderboards import rebuild
+from cride.utils.seeding import PASSWORD, seed
+import time
+
+
+class Command(BaseCommand):
+    """Create synthetic users, circles and memberships."""
+
+    help = 'Create synthetic users with profiles, circles and power-law distributed memberships.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--circles', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same dataset.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users, circles, memberships = seed(
+            options['users'], options['circles'],
+            seed=options['seed'], batch_size=options['batch_size']
+        )
+        # Bulk inserts skip the signals ranking new rows.
+        rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            '{} users, {} circles and {} memberships created in {:.1f} s.'.format(
+                users, circles, memberships, time.perf_counter() - started
+            )
+        ))
+        self.stdout.write('Every seeded user has the password {}.'.format(PASSWORD))
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-17 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['user', 'circle', 'is_active', 'is_admin'], name='circles_membership_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circles', '0002_membership_lookup_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='circle',
+            index=models.Index(fields=['is_public', '-rides_taken', '-rides_offered', '-id'], name='circles_circle_ranking_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.13 on 2026-10-17 19:16
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circles', '0003_circle_ranking_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='circle',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Full text search document, maintained by a database trigger.', null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION circles_circle_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.slug_name, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.about, '')), 'B');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER circles_circle_search_vector_trigger
+                BEFORE INSERT OR UPDATE ON circles_circle
+                FOR EACH ROW EXECUTE PROCEDURE circles_circle_search_vector_update();
+
+                UPDATE circles_circle SET search_vector =
+                        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(slug_name, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(about, '')), 'B');
+            """,
+            reverse_sql="""
+                DROP TRIGGER circles_circle_search_vector_trigger ON circles_circle;
+                DROP FUNCTION circles_circle_search_vector_update();
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='circle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='circles_circle_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='circle',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='circles_circle_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
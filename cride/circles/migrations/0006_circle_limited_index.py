@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-17 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circles', '0005_invitation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='circle',
+            index=models.Index(fields=['is_limited', '-rides_taken', '-rides_offered', '-id'], name='circles_circle_limited_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.13 on 2026-10-17 20:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circles', '0006_circle_limited_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                DROP TRIGGER circles_circle_search_vector_trigger ON circles_circle;
+                CREATE TRIGGER circles_circle_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF name, slug_name, about ON circles_circle
+                FOR EACH ROW EXECUTE PROCEDURE circles_circle_search_vector_update();
+            """,
+            reverse_sql="""
+                DROP TRIGGER circles_circle_search_vector_trigger ON circles_circle;
+                CREATE TRIGGER circles_circle_search_vector_trigger
+                BEFORE INSERT OR UPDATE ON circles_circle
+                FOR EACH ROW EXECUTE PROCEDURE circles_circle_search_vector_update();
+            """,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.13 on 2026-10-17 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circles', '0007_search_trigger_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='circle',
+            name='circles_circle_limited_idx',
+        ),
+        migrations.AddIndex(
+            model_name='circle',
+            index=models.Index(fields=['is_limited', 'id'], name='circles_circle_limited_idx'),
+        ),
+    ]
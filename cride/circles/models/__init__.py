@@ -1,2 +1,3 @@
 from .circles import Circle
 from .memberships import Membership
+from .invitations import Invitation
@@ -1,6 +1,8 @@
 """Circle model."""
 
 # Django
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 # Utilities
@@ -52,6 +54,13 @@ class Circle(CRideModel):
         help_text='If circle is limited, this will be the limit on the number of members.'
     )
 
+    # Search
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text='Full text search document, maintained by a database trigger.'
+    )
+
     def __str__(self):
         """Return circle name."""
         return self.name
@@ -60,3 +69,13 @@ class Circle(CRideModel):
         """Meta class."""
 
         ordering = ['-rides_taken', '-rides_offered']
+        indexes = [
+            models.Index(
+                fields=['is_public', '-rides_taken', '-rides_offered', '-id'],
+                name='circles_circle_ranking_idx'
+            ),
+            # Admin is_limited filter, ordered by primary key.
+            models.Index(fields=['is_limited', 'id'], name='circles_circle_limited_idx'),
+            GinIndex(fields=['search_vector'], name='circles_circle_search_idx'),
+            GinIndex(fields=['name'], name='circles_circle_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
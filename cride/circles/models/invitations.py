@@ -0,0 +1,52 @@
+"""Invitation model."""
+
+# Django
+from django.db import models
+
+# Utilities
+from cride.utils.models import CRideModel
+
+
+class Invitation(CRideModel):
+    """Circle invitation.
+
+    An invitation is a unique code issued by a circle member that lets
+    one user join the circle. Codes are generated in bulk when the
+    member is granted invitations (see cride.circles.invitations) and
+    consumed once.
+    """
+
+    code = models.CharField(max_length=50, unique=True)
+
+    issued_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        help_text='Circle member that is providing the invitation',
+        related_name='issued_by'
+    )
+    used_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        null=True,
+        help_text='User that used the code to enter the circle'
+    )
+
+    circle = models.ForeignKey('circles.Circle', on_delete=models.CASCADE)
+
+    used = models.BooleanField(default=False)
+    used_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        """Return code and circle."""
+        return '#{}: {}'.format(self.circle.slug_name, self.code)
+
+    class Meta(CRideModel.Meta):
+        """Meta class."""
+
+        indexes = [
+            # Unused codes of a member, listed to share them.
+            models.Index(
+                fields=['issued_by', 'circle', 'used'],
+                name='circles_invitation_issuer_idx'
+            ),
+        ]
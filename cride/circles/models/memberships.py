@@ -49,4 +49,14 @@ class Membership(CRideModel):
         return '@{} at #{}'.format(
             self.user.username,
             self.circle.slug_name
-        )
\ No newline at end of file
+        )
+
+    class Meta(CRideModel.Meta):
+        """Meta class."""
+
+        indexes = [
+            models.Index(
+                fields=['user', 'circle', 'is_active', 'is_admin'],
+                name='circles_membership_lookup_idx'
+            ),
+        ]
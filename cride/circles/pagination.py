@@ -0,0 +1,18 @@
+"""Circles pagination."""
+
+# Django
+from django.conf import settings
+
+# Utilities
+from cride.utils.pagination import KeysetPagination
+
+
+class CircleKeysetPagination(KeysetPagination):
+    """Circle keyset pagination.
+
+    Follows Circle's default ordering by ride stats, using the id
+    to break ties.
+    """
+
+    ordering = ('-rides_taken', '-rides_offered', '-id')
+    max_page_size = settings.CIRCLE_LIST_MAX_PAGE_SIZE
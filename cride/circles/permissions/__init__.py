@@ -1 +1 @@
-from .circles import IsCircleAdmin
\ No newline at end of file
+from .circles import IsCircleAdmin, IsPublicCircleOrMember
\ No newline at end of file
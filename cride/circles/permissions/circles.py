@@ -3,21 +3,24 @@
 # Django REST Framework
 from rest_framework.permissions import BasePermission
 
-# Models
-from cride.circles.models import Membership
+# Cache
+from cride.circles.cache import get_membership_map
 
 class IsCircleAdmin(BasePermission):
     """Allow acces. only to circle admins."""
     
     def has_object_permission(self, request, view, obj):
-        """Verify user have a membership in the obj."""
-        try:
-            Membership.objects.get(
-                user=request.user,
-                circle=obj,
-                is_admin=True,
-                is_active=True
-            )
-        except Membership.DoesNotExist:
-            return False
-        return True
\ No newline at end of file
+        """Verify user have an active admin membership in the obj."""
+        membership = get_membership_map(request.user).get(obj.pk)
+        return bool(membership and membership['is_admin'] and membership['is_active'])
+
+
+class IsPublicCircleOrMember(BasePermission):
+    """Allow access to public circles, and to the others only to their active members."""
+
+    def has_object_permission(self, request, view, obj):
+        """Verify the circle is public or the user has an active membership in it."""
+        if obj.is_public:
+            return True
+        membership = get_membership_map(request.user).get(obj.pk)
+        return bool(membership and membership['is_active'])
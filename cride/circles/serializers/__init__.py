@@ -1 +1,2 @@
-from .circles import *
\ No newline at end of file
+from .circles import *
+from .invitations import *
@@ -6,10 +6,26 @@ from rest_framework import serializers
 # Model
 from cride.circles.models import Circle
 
+# Utilities
+from cride.utils.serializers import (
+    ImageVariantsField,
+    PendingCountersListSerializer,
+    PendingCountersSerializerMixin,
+    SparseFieldsetsSerializerMixin,
+    StagedImagesSerializerMixin
+)
 
-class CircleModelSerializer(serializers.ModelSerializer):
+
+class CircleModelSerializer(
+    SparseFieldsetsSerializerMixin,
+    StagedImagesSerializerMixin,
+    PendingCountersSerializerMixin,
+    serializers.ModelSerializer
+):
     """Circle model serializer."""
-    
+
+    picture_variants = ImageVariantsField(source='picture')
+
     members_limit = serializers.IntegerField(
         required=False,
         min_value=10,
@@ -22,9 +38,10 @@ class CircleModelSerializer(serializers.ModelSerializer):
         """Meta class."""
         
         model = Circle
+        list_serializer_class = PendingCountersListSerializer
         fields = (
             'name','slug_name',
-            'about', 'picture',
+            'about', 'picture', 'picture_variants',
             'rides_offered', 'rides_taken',
             'verified', 'is_public',
             'is_limited', 'members_limit'
@@ -0,0 +1,36 @@
+"""Invitation serializers."""
+
+# Django REST Framework
+from rest_framework import serializers
+
+# Model
+from cride.circles.models import Invitation
+
+# Invitations
+from cride.circles.invitations import redeem
+
+
+class InvitationModelSerializer(serializers.ModelSerializer):
+    """Invitation model serializer."""
+
+    class Meta:
+        """Meta class."""
+
+        model = Invitation
+        fields = ('code', 'created')
+
+
+class RedeemInvitationSerializer(serializers.Serializer):
+    """Join a circle with an invitation code.
+
+    Requires the requesting user in the context.
+    """
+
+    code = serializers.CharField(max_length=50)
+
+    def create(self, data):
+        """Consume the code and return the new membership."""
+        try:
+            return redeem(data['code'], self.context['request'].user)
+        except ValueError as error:
+            raise serializers.ValidationError({'code': str(error)})
@@ -0,0 +1,61 @@
+"""Circles signals."""
+
+# Django
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# Models
+from cride.circles.models import Circle, Membership
+
+# Cache
+from cride.circles.cache import bump_list_version, invalidate_membership_map
+
+# Invitations
+from cride.circles.invitations import top_up_codes
+
+# Leaderboards
+from cride.utils import leaderboards
+
+
+@receiver(post_save, sender=Circle)
+@receiver(post_delete, sender=Circle)
+def invalidate_circle_list(sender, **kwargs):
+    """Invalidate the cached public circle list whenever a circle changes.
+
+    Done once committed: a reader filling the new version before then
+    would cache the old rows.
+    """
+    transaction.on_commit(bump_list_version)
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_user_memberships(sender, instance, **kwargs):
+    """Invalidate the cached membership map of the membership's user."""
+    invalidate_membership_map(instance.user_id)
+
+
+@receiver(post_save, sender=Circle)
+@receiver(post_save, sender=Membership)
+def sync_leaderboard(sender, instance, **kwargs):
+    """Rank new public circles and active members, drop the others, once committed."""
+    transaction.on_commit(lambda: leaderboards.sync(instance))
+
+
+@receiver(post_delete, sender=Circle)
+@receiver(post_delete, sender=Membership)
+def discard_from_leaderboard(sender, instance, **kwargs):
+    """Remove deleted circles and members from their leaderboard, once committed."""
+    transaction.on_commit(lambda: leaderboards.discard(instance))
+
+
+@receiver(post_save, sender=Membership)
+def create_invitation_codes(sender, instance, **kwargs):
+    """Generate the codes of the invitations a member is granted.
+
+    Covers new members as well as invitations granted later, by saving
+    a higher remaining_invitations.
+    """
+    if instance.remaining_invitations:
+        top_up_codes(instance)
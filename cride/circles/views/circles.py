@@ -1,38 +1,179 @@
 """Circle views."""
 
+# Django
+from django.http import StreamingHttpResponse
+
 # Django REST Framework
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
 # Permissions
-from cride.circles.permissions import IsCircleAdmin
+from cride.circles.permissions import IsCircleAdmin, IsPublicCircleOrMember
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.exceptions import MethodNotAllowed, PermissionDenied
 
 # Serializers
-from cride.circles.serializers import CircleModelSerializer
+from cride.circles.serializers import (
+    CircleModelSerializer,
+    InvitationModelSerializer,
+    RedeemInvitationSerializer
+)
 
 # Models
-from cride.circles.models import Circle, Membership
+from cride.circles.models import Circle, Invitation, Membership
+from cride.users.models import User
+
+# Pagination
+from cride.circles.pagination import CircleKeysetPagination
+
+# Cache
+from cride.circles import cache as circles_cache
+
+# Imports
+from cride.circles.imports import get_identifier, import_members, parse_members
 
+# Utilities
+from cride.utils import leaderboards
+from cride.utils.search import search_results
+from cride.utils.views import ConditionalGetMixin, InstrumentedViewSetMixin, SparseFieldsetsViewMixin
+import json
 
-class CircleViewSet(viewsets.ModelViewSet):
+
+class CircleViewSet(
+    InstrumentedViewSetMixin,
+    ConditionalGetMixin,
+    SparseFieldsetsViewMixin,
+    viewsets.ModelViewSet
+):
     """Circle view set."""
 
     serializer_class = CircleModelSerializer
+    pagination_class = CircleKeysetPagination
     lookup_field = 'slug_name'
 
     def get_queryset(self):
-        """Restrict list to public-only."""
-        queryset = Circle.objects.all()
+        """Restrict list to public-only.
+
+        Listed pages are cached: they are read from the primary, so a
+        lagging replica is never cached under a new list version.
+        """
+        queryset = Circle.objects.defer('search_vector')
         if self.action == 'list':
-            return queryset.filter(is_public=True)
+            return queryset.using('default').filter(is_public=True)
         return queryset
-    
+
+    def get_validators(self):
+        """Build the list ETag from the list cache version.
+
+        The version changes with every circle write, delete or counters
+        flush, so lists are validated without scanning the table.
+        """
+        if self.action == 'list':
+            return self.build_validators(None, circles_cache.get_list_version())
+        return super(CircleViewSet, self).get_validators()
+
+    def list(self, request, *args, **kwargs):
+        """List public circles, serving pages from the cache when possible."""
+        page_size = self.paginator.get_page_size(request)
+        cursor = request.query_params.get(self.paginator.cursor_query_param)
+        fieldset = self.get_serializer().get_fieldset_key()
+        origin = request.build_absolute_uri('/')
+        key = circles_cache.get_list_page_key(page_size, cursor, fieldset, origin)
+        data = circles_cache.get_list_page(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super(CircleViewSet, self).list(request, *args, **kwargs)
+        circles_cache.set_list_page(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @action(detail=False, methods=['GET'])
+    def search(self, request, *args, **kwargs):
+        """Search public circles by name, slug name and description."""
+        circles = search_results(
+            self.filter_queryset(Circle.objects.filter(is_public=True).defer('search_vector')),
+            request.query_params.get('q', '')
+        )
+        serializer = self.get_serializer(circles, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def leaderboard(self, request, *args, **kwargs):
+        """List the public circles with the most rides."""
+        top = leaderboards.get_top(leaderboards.CIRCLES_KEY, leaderboards.get_limit(request.query_params.get('limit')))
+        circles = Circle.objects.only('name', 'slug_name').in_bulk([pk for pk, _ in top])
+        results = []
+        for rank, (pk, score) in enumerate(top, 1):
+            if pk in circles:
+                rides_taken, rides_offered = leaderboards.split_rides_score(score)
+                results.append({
+                    'rank': rank,
+                    'slug_name': circles[pk].slug_name,
+                    'name': circles[pk].name,
+                    'rides_taken': rides_taken,
+                    'rides_offered': rides_offered,
+                })
+        return Response({'results': results})
+
+    @action(detail=True, methods=['GET'], url_path='leaderboard')
+    def members_leaderboard(self, request, *args, **kwargs):
+        """List the circle members with the most rides and the requester's rank."""
+        circle = self.get_object()
+        top = leaderboards.get_top(
+            leaderboards.CIRCLE_MEMBERS_KEY.format(circle_pk=circle.pk),
+            leaderboards.get_limit(request.query_params.get('limit'))
+        )
+        users = User.objects.only('username').in_bulk([pk for pk, _ in top])
+        results = []
+        for rank, (pk, score) in enumerate(top, 1):
+            if pk in users:
+                rides_taken, rides_offered = leaderboards.split_rides_score(score)
+                results.append({
+                    'rank': rank,
+                    'username': users[pk].username,
+                    'rides_taken': rides_taken,
+                    'rides_offered': rides_offered,
+                })
+        return Response({
+            'rank': leaderboards.get_member_rank(circle.pk, request.user.pk),
+            'results': results
+        })
+
+    @action(detail=True, methods=['GET'])
+    def invitations(self, request, *args, **kwargs):
+        """List the requester's unused invitation codes for the circle."""
+        circle = self.get_object()
+        membership = circles_cache.get_membership_map(request.user).get(circle.pk)
+        if membership is None or not membership['is_active']:
+            raise PermissionDenied('You are not a member of this circle.')
+        invitations = Invitation.objects.filter(
+            issued_by=request.user,
+            circle=circle,
+            used=False
+        ).only('code', 'created').order_by('created')
+        return Response(InvitationModelSerializer(invitations, many=True).data)
+
+    @action(detail=False, methods=['POST'])
+    def join(self, request, *args, **kwargs):
+        """Join the circle an invitation code belongs to."""
+        serializer = RedeemInvitationSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        membership = serializer.save()
+        data = CircleModelSerializer(membership.circle).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
     def get_permissions(self):
         """Assign permissions based on action."""
         permissions = [IsAuthenticated]
-        if self.action in ['update', 'partial_update']:
+        if self.action in ['update', 'partial_update', 'import_members']:
             permissions.append(IsCircleAdmin)
+        elif self.action == 'members_leaderboard':
+            permissions.append(IsPublicCircleOrMember)
         return [permission() for permission in permissions]
 
     def perform_create(self, serializer):
@@ -49,4 +190,33 @@ class CircleViewSet(viewsets.ModelViewSet):
         )
     
     def destroy(self, request, pk=None):
-        raise MethodNotAllowed('DELETE')
\ No newline at end of file
+        raise MethodNotAllowed('DELETE')
+
+    @action(detail=True, methods=['POST'], url_path='members/import')
+    def import_members(self, request, *args, **kwargs):
+        """Add users to the circle in bulk.
+
+        Accepts a CSV or JSON `file` upload, or a JSON body with a
+        `members` list of usernames or emails. The import is committed
+        first, then one JSON line per member is streamed with the result
+        of its import.
+        """
+        circle = self.get_object()
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                file_format = 'json' if upload.name.endswith('.json') else 'csv'
+                identifiers = parse_members(upload.read().decode('utf-8'), file_format)
+            else:
+                members = request.data.get('members') if hasattr(request.data, 'get') else request.data
+                if not isinstance(members, list):
+                    raise ValueError('A list of members is required.')
+                identifiers = [get_identifier(member) for member in members]
+        except (ValueError, UnicodeDecodeError) as error:
+            raise ValidationError(str(error))
+
+        results = import_members(circle, identifiers, invited_by=request.user)
+        return StreamingHttpResponse(
+            (json.dumps(result) + '\n' for result in results),
+            content_type='application/x-ndjson'
+        )
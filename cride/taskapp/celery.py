@@ -1,9 +1,14 @@
 """Celery app config."""
 
 import os
+import time
 from celery import Celery
+from celery.signals import before_task_publish, task_postrun, task_prerun
 from django.apps import apps, AppConfig
 from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from kombu.serialization import register
+from kombu.utils import json
 
 
 if not settings.configured:
@@ -11,6 +16,18 @@ if not settings.configured:
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.local')  # pragma: no cover
 
 
+def compact_dumps(obj):
+    """Serialize a message body to JSON without whitespace."""
+    return json.dumps(obj, separators=(',', ':'))
+
+
+register(
+    'compactjson', compact_dumps, json.loads,
+    content_type='application/x-compactjson',
+    content_encoding='utf-8'
+)
+
+
 app = Celery('cride')
 # Using a string here means the worker will not have to
 # pickle the object when using Windows.
@@ -31,3 +48,71 @@ class CeleryAppConfig(AppConfig):
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')  # pragma: no cover
+
+
+def get_queue_depths():
+    """Return the number of messages waiting in each queue, by queue label.
+
+    Adds up the lengths of the Redis lists holding each priority step of
+    the queues.
+    """
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        pipe = channel.client.pipeline(transaction=False)
+        for queue in settings.TASK_QUEUES:
+            for priority in channel.priority_steps:
+                pipe.llen(channel._q_for_pri(queue, priority))
+        lengths = iter(pipe.execute())
+        return {
+            (('queue', queue),): sum(next(lengths) for _ in channel.priority_steps)
+            for queue in settings.TASK_QUEUES
+        }
+
+
+# Task metrics, see cride.utils.metrics.
+
+@before_task_publish.connect
+def stamp_published_task(headers=None, **kwargs):
+    """Record when a task is sent, to measure its time in the queue."""
+    if headers is not None:
+        headers['published_at'] = time.time()
+
+
+@task_prerun.connect
+def measure_task_wait(task=None, **kwargs):
+    """Record the time a task waited in its queue and start its run timer."""
+    # Imported here: metrics needs the Django settings loaded.
+    from cride.utils import metrics
+
+    request = task.request
+    queue = (request.delivery_info or {}).get('routing_key', 'unknown')
+    request.started_at = time.time()
+    published_at = getattr(request, 'published_at', None)
+    if published_at is None:
+        return
+    # Tasks with a countdown wait on purpose until their ETA.
+    if request.eta:
+        published_at = max(published_at, _parse_eta(request.eta))
+    metrics.task_wait_duration.observe(
+        max(request.started_at - published_at, 0), task=task.name, queue=queue
+    )
+
+
+@task_postrun.connect
+def measure_task_run(task=None, state=None, **kwargs):
+    """Record the run time of a task."""
+    from cride.utils import metrics
+
+    request = task.request
+    started_at = getattr(request, 'started_at', None)
+    if started_at is None or request.is_eager:
+        return
+    queue = (request.delivery_info or {}).get('routing_key', 'unknown')
+    metrics.task_run_duration.observe(time.time() - started_at, task=task.name, queue=queue, state=state)
+
+
+def _parse_eta(eta):
+    """Return the timestamp of a task ETA, given as an ISO 8601 string or datetime."""
+    if isinstance(eta, str):
+        eta = parse_datetime(eta)
+    return eta.timestamp()
@@ -0,0 +1,188 @@
+"""Celery tasks."""
+
+# Django
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+# Celery
+from cride.taskapp.celery import app
+
+# Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+# Models
+from cride.circles.models import Circle
+from cride.users.models import User
+
+# Cache
+from cride.circles.cache import bump_list_version
+
+# Reputation
+from cride.users import reputation
+
+# Utilities
+from cride.utils import counters
+from cride.utils.redis_client import acquire_lock, get_redis, release_lock
+from cride.utils.images import discard_staged_image, is_staged, process_staged_image
+from datetime import timedelta
+import jwt
+
+
+CONFIRMATION_EMAIL_QUEUE_KEY = 'confirmation_email:queue'
+CONFIRMATION_EMAIL_SCHEDULED_KEY = 'confirmation_email:scheduled'
+CONFIRMATION_EMAIL_LOCK_KEY = 'confirmation_email:lock'
+CONFIRMATION_EMAIL_SENT_KEY = 'confirmation_email:sent:{}'
+# Verification tokens expire after 3 days, so do the sent markers.
+CONFIRMATION_EMAIL_SENT_TIMEOUT = 3 * 24 * 60 * 60
+
+
+def gen_verification_token(user):
+    """Create JWT token that the user can use to verify its account."""
+    exp_date = timezone.now() + timedelta(days=3)
+    payload = {
+        'user': user.username,
+        'exp': int(exp_date.timestamp()),
+        'type': 'email_confirmation'
+    }
+    token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+    return token.decode()
+
+
+def build_confirmation_email(user, connection=None):
+    """Return the account verification message of the given user."""
+    verification_token = gen_verification_token(user)
+    subject = 'Welcome @{}! Verify your account to start using Comparte Ride'.format(user.username)
+    from_email = 'Comparte Ride <noreply@comparteride.com>'
+    content = render_to_string(
+        'emails/users/account_verification.html',
+        {'token': verification_token, 'user': user}
+    )
+    msg = EmailMultiAlternatives(subject, content, from_email, [user.email], connection=connection)
+    msg.attach_alternative(content, 'text/html')
+    return msg
+
+
+@app.task(name='send_confirmation_email', bind=True, max_retries=3)
+def send_confirmation_email(self, user_pk):
+    """Queue the account verification email of the given user.
+
+    Messages are queued on a Redis list and sent together by
+    flush_confirmation_emails, which runs once per batch window.
+    """
+    client = get_redis()
+    try:
+        client.rpush(CONFIRMATION_EMAIL_QUEUE_KEY, user_pk)
+        window = settings.CONFIRMATION_EMAIL_BATCH_WINDOW
+        scheduled = client.set(CONFIRMATION_EMAIL_SCHEDULED_KEY, 1, nx=True, ex=window * 2)
+    except RedisConnectionError as error:
+        raise self.retry(exc=error)
+    if scheduled:
+        flush_confirmation_emails.apply_async(countdown=window)
+
+
+@app.task(name='flush_confirmation_emails', bind=True, max_retries=3)
+def flush_confirmation_emails(self):
+    """Send every queued verification email over a single connection.
+
+    Each batch is taken off the queue atomically before being sent, so a
+    redelivered or concurrent flush never sends it again. Every user is
+    marked as sent before its email goes out, so users queued twice, by a
+    redelivered send_confirmation_email, get a single email. When a batch
+    fails, the emails not sent are put back at the head of the queue and
+    the flush retried.
+    """
+    window = settings.CONFIRMATION_EMAIL_BATCH_WINDOW
+    token = acquire_lock(CONFIRMATION_EMAIL_LOCK_KEY, settings.CELERYD_TASK_TIME_LIMIT)
+    if token is None:
+        raise self.retry(countdown=window)
+
+    client = get_redis()
+    batch_size = settings.CONFIRMATION_EMAIL_BATCH_SIZE
+    try:
+        # Any email queued from now on schedules a new flush.
+        client.delete(CONFIRMATION_EMAIL_SCHEDULED_KEY)
+        while True:
+            pipe = client.pipeline(transaction=True)
+            pipe.lrange(CONFIRMATION_EMAIL_QUEUE_KEY, 0, batch_size - 1)
+            pipe.ltrim(CONFIRMATION_EMAIL_QUEUE_KEY, batch_size, -1)
+            user_pks = pipe.execute()[0]
+            if not user_pks:
+                return
+
+            user_pks = list(dict.fromkeys(int(pk) for pk in user_pks))
+            pipe = client.pipeline(transaction=False)
+            for pk in user_pks:
+                pipe.set(CONFIRMATION_EMAIL_SENT_KEY.format(pk), 1, nx=True, ex=CONFIRMATION_EMAIL_SENT_TIMEOUT)
+            user_pks = [pk for pk, marked in zip(user_pks, pipe.execute()) if marked]
+
+            sent = set()
+            try:
+                users = User.objects.filter(pk__in=user_pks, is_verified=False)
+                with get_connection() as connection:
+                    for user in users:
+                        connection.send_messages([build_confirmation_email(user, connection=connection)])
+                        sent.add(user.pk)
+            except Exception as error:
+                unsent = [pk for pk in user_pks if pk not in sent]
+                if unsent:
+                    client.delete(*[CONFIRMATION_EMAIL_SENT_KEY.format(pk) for pk in unsent])
+                    client.lpush(CONFIRMATION_EMAIL_QUEUE_KEY, *reversed(unsent))
+                raise self.retry(exc=error, countdown=window)
+    finally:
+        release_lock(CONFIRMATION_EMAIL_LOCK_KEY, token)
+
+
+@app.task(name='flush_counters', ignore_result=True)
+def flush_counters():
+    """Write the pending stat counter deltas to the database.
+
+    Safe to run twice: a flush already written is recognized by its id
+    and not applied again, see cride.utils.counters.
+    """
+    updated = counters.flush()
+    if updated and updated.get('circles.circle'):
+        bump_list_version()
+
+
+@app.task(
+    name='recompute_reputation',
+    ignore_result=True,
+    soft_time_limit=settings.REPUTATION_TIME_LIMIT,
+    time_limit=settings.REPUTATION_TIME_LIMIT + 60
+)
+def recompute_reputation(incremental=True):
+    """Recompute the reputation of the profiles changed since the last run, or all of them."""
+    reputation.recompute(incremental=incremental)
+
+
+@app.task(name='process_image', bind=True, max_retries=3)
+def process_image(self, model_label, pk, field_name, staged_name):
+    """Process a staged picture upload of the given instance.
+
+    Failures are retried; the staged file is deleted once processed,
+    when the instance is gone or after the last retry.
+    """
+    # Already processed by a previous delivery of this task.
+    if not is_staged(staged_name):
+        return
+
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.get(pk=pk)
+    except model.DoesNotExist:
+        discard_staged_image(staged_name)
+        return
+
+    try:
+        process_staged_image(instance, field_name, staged_name)
+    except Exception as error:
+        if self.request.retries >= self.max_retries:
+            discard_staged_image(staged_name)
+            raise
+        raise self.retry(exc=error)
+
+    if model is Circle:
+        bump_list_version()
@@ -7,21 +7,62 @@ from django.contrib.auth.admin import UserAdmin
 # Models
 from cride.users.models import User, Profile
 
+# Utilities
+from cride.utils.admin import IndexedSearchAdminMixin, LargeTableAdminMixin
 
-class CustomUserAdmin(UserAdmin):
+
+class CustomUserAdmin(LargeTableAdminMixin, IndexedSearchAdminMixin, UserAdmin):
     """User model admin."""
 
+    search_trigram_field = 'username'
+    search_exact_fields = ('email',)
+
     list_display = ('email', 'username', 'first_name', 'last_name', 'is_staff', 'is_client')
     list_filter = ('is_client', 'is_staff', 'created', 'modified')
 
 
+class ReputationListFilter(admin.SimpleListFilter):
+    """Filter profiles by reputation range.
+
+    Listing every distinct reputation would read the whole index, the
+    ranges are range scans on it.
+    """
+
+    title = 'reputation'
+    parameter_name = 'reputation'
+
+    RANGES = {
+        '1': (1, 2),
+        '2': (2, 3),
+        '3': (3, 4),
+        '4': (4, 5.01),
+    }
+
+    def lookups(self, request, model_admin):
+        return [('1', '1 to 2'), ('2', '2 to 3'), ('3', '3 to 4'), ('4', '4 to 5')]
+
+    def queryset(self, request, queryset):
+        bounds = self.RANGES.get(self.value())
+        if bounds is None:
+            return queryset
+        return queryset.filter(reputation__gte=bounds[0], reputation__lt=bounds[1])
+
+
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(LargeTableAdminMixin, IndexedSearchAdminMixin, admin.ModelAdmin):
     """Profile model admin."""
 
+    search_vector_field = 'user__search_vector'
+    search_trigram_field = 'user__username'
+    search_exact_fields = ('user__email',)
+
     list_display = ('user', 'reputation', 'rides_taken', 'rides_offered')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name')
-    list_filter = ('reputation',)
+    list_filter = (ReputationListFilter,)
+    raw_id_fields = ('user',)
+    # Newest first through the primary key index.
+    ordering = ('-pk',)
 
 
 admin.site.register(User, CustomUserAdmin)
@@ -0,0 +1,83 @@
+"""Users authentication."""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+
+# Django REST Framework
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+# Utilities
+import hashlib
+
+
+TOKEN_CACHE_KEY = 'users:auth_token:{}'
+
+
+def get_token_cache_key(key):
+    """Return the cache key of an authentication token."""
+    return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_token(key):
+    """Drop a cached authentication token."""
+    cache.delete(get_token_cache_key(key))
+
+
+def invalidate_user_tokens(user_pk):
+    """Drop the cached authentication tokens of a user."""
+    # Imported here: the authtoken models need the app registry ready.
+    from rest_framework.authtoken.models import Token
+
+    cache.delete_many([
+        get_token_cache_key(key)
+        for key in Token.objects.filter(user_id=user_pk).values_list('key', flat=True)
+    ])
+
+
+def get_cached_fields(user_model):
+    """Return the attribute names of the user fields kept in the token cache.
+
+    The password hash is left out of the cache and the search vector is
+    of no use to a request.
+    """
+    return [
+        field.attname for field in user_model._meta.concrete_fields
+        if field.name not in ('password', 'search_vector')
+    ]
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication backed by the cache.
+
+    The cache maps every token to the fields of its user, so
+    authenticated requests don't query the database until the entry
+    expires. Users are rebuilt with their password deferred: it is
+    only read, from the database, if needed, and saving them never
+    overwrites it. Entries are dropped when the token is deleted
+    (logout) and when the user is saved (password changes, deactivation),
+    see cride.users.signals. Changes made with update() apply once the
+    entry expires.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        user_model = model._meta.get_field('user').related_model
+        names = get_cached_fields(user_model)
+        cache_key = get_token_cache_key(key)
+        values = cache.get(cache_key)
+        if values is None:
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed('Invalid token.')
+            values = [getattr(token.user, name) for name in names]
+            cache.set(cache_key, values, timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        else:
+            token = model(key=key, user=user_model.from_db('default', names, values))
+
+        if not token.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        return (token.user, token)
@@ -0,0 +1,18 @@
+"""Users password hashers."""
+
+# Django
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 hasher with its cost parameters taken from the settings.
+
+    Keeps the argon2 algorithm name, so stored hashes made with other
+    parameters are still verified and, through must_update(), rehashed
+    with the configured ones on the user's next login.
+    """
+
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
@@ -0,0 +1,28 @@
+"""Recompute reputations."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Utilities
+from cride.users.reputation import recompute
+import time
+
+
+class Command(BaseCommand):
+    """Recompute the profiles reputation from their ride stats."""
+
+    help = 'Recompute the reputation of the profiles changed since the last run, or of all of them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Score every profile, not only the changed ones.')
+        parser.add_argument('--batch-size', type=int, help='Rows read and written per round trip.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = recompute(incremental=not options['full'], batch_size=options['batch_size'])
+        if result is None:
+            raise CommandError('Another reputation run is in progress.')
+        scored, updated = result
+        self.stdout.write(self.style.SUCCESS(
+            'Scored {} profiles, updated {}, in {:.1f} s.'.format(scored, updated, time.perf_counter() - started)
+        ))
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.13 on 2026-10-17 19:16
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='user',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Full text search document, maintained by a database trigger.', null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION users_user_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('simple', coalesce(NEW.username, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.first_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.last_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.email, '')), 'C');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER users_user_search_vector_trigger
+                BEFORE INSERT OR UPDATE ON users_user
+                FOR EACH ROW EXECUTE PROCEDURE users_user_search_vector_update();
+
+                UPDATE users_user SET search_vector =
+                        setweight(to_tsvector('simple', coalesce(username, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(first_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(last_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(email, '')), 'C');
+            """,
+            reverse_sql="""
+                DROP TRIGGER users_user_search_vector_trigger ON users_user;
+                DROP FUNCTION users_user_search_vector_update();
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='users_user_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['username'], name='users_user_username_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.13 on 2026-10-17 20:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE OR REPLACE FUNCTION users_user_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('simple', coalesce(NEW.username, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.first_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.last_name, '')), 'B');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                DROP TRIGGER users_user_search_vector_trigger ON users_user;
+                CREATE TRIGGER users_user_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF username, first_name, last_name ON users_user
+                FOR EACH ROW EXECUTE PROCEDURE users_user_search_vector_update();
+
+                UPDATE users_user SET search_vector =
+                        setweight(to_tsvector('simple', coalesce(username, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(first_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(last_name, '')), 'B');
+            """,
+            reverse_sql="""
+                CREATE OR REPLACE FUNCTION users_user_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('simple', coalesce(NEW.username, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.first_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.last_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(NEW.email, '')), 'C');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                DROP TRIGGER users_user_search_vector_trigger ON users_user;
+                CREATE TRIGGER users_user_search_vector_trigger
+                BEFORE INSERT OR UPDATE ON users_user
+                FOR EACH ROW EXECUTE PROCEDURE users_user_search_vector_update();
+
+                UPDATE users_user SET search_vector =
+                        setweight(to_tsvector('simple', coalesce(username, '')), 'A') ||
+                        setweight(to_tsvector('simple', coalesce(first_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(last_name, '')), 'B') ||
+                        setweight(to_tsvector('simple', coalesce(email, '')), 'C');
+            """,
+        ),
+    ]
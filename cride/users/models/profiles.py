@@ -36,3 +36,10 @@ class Profile(CRideModel):
         """Return user's str representation."""
         return str(self.user)
 
+    class Meta(CRideModel.Meta):
+        """Meta class."""
+
+        indexes = [
+            models.Index(fields=['reputation'], name='users_profile_reputation_idx'),
+        ]
+
@@ -4,6 +4,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 # Utilities
 from cride.utils.models import CRideModel
@@ -48,6 +50,13 @@ class User(CRideModel, AbstractUser):
         help_text='Set to true when the user have verified its email address.'
     )
 
+    # Search
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text='Full text search document, maintained by a database trigger.'
+    )
+
     def __str__(self):
         """Return username."""
         return self.username
@@ -55,3 +64,14 @@ class User(CRideModel, AbstractUser):
     def get_short_name(self):
         """Return username."""
         return self.username
+
+    class Meta(CRideModel.Meta):
+        """Meta class."""
+
+        indexes = [
+            GinIndex(fields=['search_vector'], name='users_user_search_idx'),
+            GinIndex(fields=['username'], name='users_user_username_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Admin date filters.
+            models.Index(fields=['created'], name='users_user_created_idx'),
+            models.Index(fields=['modified'], name='users_user_modified_idx'),
+        ]
@@ -0,0 +1,185 @@
+"""Reputation.
+
+Reputations are recomputed in bulk from the ride stats of profiles and
+their active memberships. Rows are streamed from the database in chunks
+(a server-side cursor on PostgreSQL), each chunk is scored with NumPy
+array operations and only the reputations that changed are written
+back, one UPDATE ... FROM (VALUES ...) statement per chunk.
+
+A profile's reputation starts at a neutral prior, the middle of the
+scale, and moves toward the score its rides deserve as its activity
+grows: the weight of the prior decays exponentially with the weighted
+number of rides, so a couple of rides can't sink or crown anybody, and
+inactive users rank below the active ones with good scores.
+
+Incremental runs only score the profiles (or memberships) modified
+since the previous run started. Profiles written by a run keep a
+`modified` time no later than that start, so the next run skips them.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, DateTimeField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+# Models
+from cride.circles.models import Membership
+from cride.users.models import Profile
+
+# Utilities
+from cride.utils import counters, leaderboards
+from cride.utils.redis_client import acquire_lock, release_lock
+from itertools import islice
+import numpy as np
+
+
+LAST_RUN_KEY = 'users:reputation:last_run'
+LOCK_KEY = 'users:reputation:lock'
+
+MIN_REPUTATION = 1.0
+MAX_REPUTATION = 5.0
+PRIOR_REPUTATION = (MIN_REPUTATION + MAX_REPUTATION) / 2
+
+# Rides offered count more than rides taken, rides shared in circles
+# count as community involvement.
+OFFERED_WEIGHT = 1.5
+TAKEN_WEIGHT = 1.0
+CIRCLE_WEIGHT = 0.5
+
+# Weighted rides after which the prior only weighs 1 / e.
+ACTIVITY_SCALE = 20.0
+
+# Share of the score given by the offered rides ratio, the rest comes
+# from the activity itself.
+RATIO_SHARE = 0.6
+
+COLUMNS = ('pk', 'user_id', 'rides_taken', 'rides_offered', 'reputation', 'circles', 'circle_rides')
+
+
+def compute(rides_taken, rides_offered, circle_rides, circles, prior=PRIOR_REPUTATION):
+    """Return the reputations of the given stats arrays, rounded to 2 decimals."""
+    rides = rides_taken + rides_offered
+
+    # Weighted share of offered rides, neutral for users without rides.
+    weighted = OFFERED_WEIGHT * rides_offered + TAKEN_WEIGHT * rides_taken
+    ratio = np.divide(
+        OFFERED_WEIGHT * rides_offered, weighted,
+        out=np.full(rides.shape, 0.5), where=weighted > 0
+    )
+
+    # Circles count by the rides their members share, per circle.
+    community = np.divide(circle_rides, circles, out=np.zeros(rides.shape), where=circles > 0)
+    activity = weighted + CIRCLE_WEIGHT * community
+    confidence = -np.expm1(-activity / ACTIVITY_SCALE)
+
+    score = MIN_REPUTATION + (MAX_REPUTATION - MIN_REPUTATION) * (
+        RATIO_SHARE * ratio + (1 - RATIO_SHARE) * confidence
+    )
+    reputation = prior + (score - prior) * confidence
+    return np.round(np.clip(reputation, MIN_REPUTATION, MAX_REPUTATION), 2)
+
+
+def get_rows(since=None):
+    """Return the stats of the profiles to score, as COLUMNS tuples."""
+    active = Q(membership__is_active=True)
+    profiles = Profile.objects.using('default')
+    if since is not None:
+        profiles = profiles.filter(
+            Q(modified__gt=since) |
+            Q(pk__in=Membership.objects.using('default').filter(modified__gt=since).values('profile_id'))
+        )
+    return profiles.annotate(
+        circles=Count('membership', filter=active),
+        circle_rides=Coalesce(
+            Sum(F('membership__rides_taken') + F('membership__rides_offered'), filter=active), 0
+        ),
+    ).order_by().values_list(*COLUMNS)
+
+
+def get_chunks(rows, batch_size):
+    """Yield the rows of a queryset as 2D float arrays of `batch_size` rows at most."""
+    iterator = rows.iterator(chunk_size=batch_size)
+    while True:
+        chunk = list(islice(iterator, batch_size))
+        if not chunk:
+            return
+        yield np.array(chunk, dtype=np.float64)
+
+
+def write(pks, reputations, started):
+    """Set the reputation of the given profiles in one statement.
+
+    `modified` is moved to the start of the run: it still changes (and
+    so do the ETags), but the next incremental run won't rescan the
+    profile, unless it was modified during this run.
+    """
+    connection = connections['default']
+    if connection.vendor != 'postgresql':
+        modified = Greatest(F('modified'), Value(started, output_field=DateTimeField()))
+        Profile.objects.bulk_update([
+            Profile(pk=pk, reputation=reputation, modified=modified)
+            for pk, reputation in zip(pks, reputations)
+        ], ['reputation', 'modified'])
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(Profile._meta.db_table)
+    sql = (
+        'UPDATE {table} SET {reputation} = v.reputation, {modified} = GREATEST({table}.{modified}, %s) '
+        'FROM (VALUES {values}) AS v (id, reputation) '
+        'WHERE {table}.{id} = v.id'
+    ).format(
+        table=table,
+        reputation=quote('reputation'),
+        modified=quote('modified'),
+        id=quote('id'),
+        values=', '.join(['(%s, %s)'] * len(pks)),
+    )
+    params = [started]
+    for pk, reputation in zip(pks, reputations):
+        params += [pk, reputation]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def recompute(incremental=True, batch_size=None):
+    """Recompute the reputations and update the leaderboard.
+
+    Return the number of profiles scored and updated, or None if
+    another run is in progress.
+    """
+    batch_size = batch_size or settings.REPUTATION_BATCH_SIZE
+    token = acquire_lock(LOCK_KEY, settings.REPUTATION_TIME_LIMIT)
+    if token is None:
+        return None
+
+    try:
+        # Score the current ride stats.
+        counters.flush()
+        started = timezone.now()
+        since = cache.get(LAST_RUN_KEY) if incremental else None
+        scored = updated = 0
+        for chunk in get_chunks(get_rows(since), batch_size):
+            pks, user_pks, taken, offered, current, circles, circle_rides = chunk.T
+            reputations = compute(taken, offered, circle_rides, circles)
+            changed = reputations != current
+            scored += len(chunk)
+            if not changed.any():
+                continue
+
+            pks = pks[changed].astype(np.int64).tolist()
+            reputations = reputations[changed].tolist()
+            write(pks, reputations, started)
+            leaderboards.set_scores(
+                leaderboards.REPUTATION_KEY,
+                dict(zip(user_pks[changed].astype(np.int64).tolist(), reputations))
+            )
+            updated += len(pks)
+
+        cache.set(LAST_RUN_KEY, started, None)
+        return scored, updated
+    finally:
+        release_lock(LOCK_KEY, token)
@@ -6,16 +6,34 @@ from rest_framework import serializers
 # Models
 from cride.users.models import Profile
 
+# Utilities
+from cride.utils.serializers import (
+    ImageVariantsField,
+    PendingCountersListSerializer,
+    PendingCountersSerializerMixin,
+    SparseFieldsetsSerializerMixin,
+    StagedImagesSerializerMixin
+)
 
-class ProfileModelSerializer(serializers.ModelSerializer):
+
+class ProfileModelSerializer(
+    SparseFieldsetsSerializerMixin,
+    StagedImagesSerializerMixin,
+    PendingCountersSerializerMixin,
+    serializers.ModelSerializer
+):
     """Profile model serializer."""
 
+    picture_variants = ImageVariantsField(source='picture')
+
     class Meta:
         """Meta class."""
 
         model = Profile
+        list_serializer_class = PendingCountersListSerializer
         fields = (
             'picture',
+            'picture_variants',
             'biography',
             'rides_taken',
             'rides_offered',
@@ -2,6 +2,7 @@
 
 # Django
 from django.contrib.auth import authenticate, password_validation
+from django.db import transaction
 
 # Django REST Framework
 from rest_framework import serializers
@@ -17,20 +18,29 @@ from cride.users.models import User, Profile
 # Serializer THIS SERIALIZER ALLOW US SEE ALL THE INFORMATION FROM DE PROFILE.
 from cride.users.serializers.profiles import ProfileModelSerializer
 
-# Email
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+# Tasks
+from cride.taskapp.tasks import send_confirmation_email
+
+# Sparse fieldsets
+from cride.utils.serializers import SparseFieldsetsSerializerMixin
 
 # JWT
 import jwt
 
 # Utilities
 from django.conf import settings
-from django.utils import timezone
-from datetime import timedelta
+from django.core.cache import cache
+import hashlib
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
 
+VERIFICATION_CONSUMED_KEY = 'users:verification:consumed:{}'
 
-class UserModelSerializer(serializers.ModelSerializer):
+
+class UserModelSerializer(SparseFieldsetsSerializerMixin, serializers.ModelSerializer):
     """User model serializer."""
 
     # profile redefinition this allow us see all the data from de profile, and it's only reading.
@@ -50,6 +60,26 @@ class UserModelSerializer(serializers.ModelSerializer):
         )
 
 
+class UserSearchSerializer(SparseFieldsetsSerializerMixin, serializers.ModelSerializer):
+    """User search result serializer.
+
+    Only exposes the user's public data.
+    """
+
+    profile = ProfileModelSerializer(read_only=True)
+
+    class Meta:
+        """Meta class."""
+
+        model = User
+        fields = (
+            'username',
+            'first_name',
+            'last_name',
+            'profile'
+        )
+
+
 class UserSignUpSerializer(serializers.Serializer):
     """User sign up serializer.
     
@@ -102,34 +132,9 @@ class UserSignUpSerializer(serializers.Serializer):
         data.pop('password_confirmation')
         user = User.objects.create_user(**data, is_verified=False, is_client=True)
         Profile.objects.create(user=user)
-        self.send_confirmation_email(user)
+        transaction.on_commit(lambda: send_confirmation_email.delay(user_pk=user.pk))
         return user
-    
-    def send_confirmation_email(self, user):
-        """Send account verification link to given user."""
-        verification_token = self.gen_verification_token(user)
-        subject = 'Welcome @{}! Verify your account to start using Comparte Ride'.format(user.username)
-        from_email = 'Comparte Ride <noreply@comparteride.com>'
-        content = render_to_string(
-            'emails/users/account_verification.html',
-            {'token': verification_token, 'user': user}
-        )
-        msg = EmailMultiAlternatives(subject, content, from_email, [user.email])
-        msg.attach_alternative(content, "text/html")
-        msg.send()
-
-    def gen_verification_token(self, user):
-        """Create JWT token that the user can use to verify its account."""
-        exp_date = timezone.now() + timedelta(days=3)
-        payload = {
-            'user': user.username,
-            'exp': int(exp_date.timestamp()), # Expiration date Timestamp integer.
-            'type': 'email_confirmation'
-        }
-        
-        token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
-        return token.decode()
-    
+
 
 class UserLoginSerializer(serializers.Serializer):
     """User login serializer.
@@ -157,29 +162,65 @@ class UserLoginSerializer(serializers.Serializer):
     
     
 class AccountVerificationSerializer(serializers.Serializer):
-    """Account verification serializer."""
-        
+    """Account verification serializer.
+
+    Consumed tokens are remembered in the cache until they expire, so
+    repeated clicks on the verification link skip the JWT decoding and
+    never reach the database.
+    """
+
     token = serializers.CharField()
-        
+
     def validate_token(self, data):
         """Verify token is valid."""
+        started = time.perf_counter()
+        self.context['consumed_key'] = VERIFICATION_CONSUMED_KEY.format(
+            hashlib.sha256(data.encode()).hexdigest()
+        )
+        if cache.get(self.context['consumed_key']):
+            self.context['payload'] = None
+            self.context['decode_time'] = time.perf_counter() - started
+            return data
+
         try:
             payload = jwt.decode(data, settings.SECRET_KEY, algorithms=['HS256'])
         except jwt.ExpiredSignatureError:
             raise serializers.ValidationError('Verification link has expired.')
         except jwt.PyJWTError:
-            raise serializers.ValidationError('Invalid token2')   
+            raise serializers.ValidationError('Invalid token2')
         if payload['type'] != 'email_confirmation':
             raise serializers.ValidationError('Invalid token')
-            
+
         self.context['payload'] = payload
+        self.context['decode_time'] = time.perf_counter() - started
         return data
-        
+
     def save(self):
-        """Update user's verified status."""
+        """Update user's verified status with a single conditional UPDATE."""
         payload = self.context['payload']
-        user = User.objects.get(username=payload['user'])
-        user.is_verified=True
-        user.save()
-    
-    
\ No newline at end of file
+        if payload is None:
+            logger.info(
+                'account_verification outcome=cached decode_ms=%.2f update_ms=0.00',
+                self.context['decode_time'] * 1000
+            )
+            return
+
+        started = time.perf_counter()
+        updated = User.objects.filter(
+            username=payload['user'],
+            is_verified=False
+        ).update(is_verified=True)
+        update_time = time.perf_counter() - started
+
+        # Remember the token until it expires, once the update is committed.
+        timeout = min(payload['exp'] - int(time.time()), settings.VERIFICATION_CONSUMED_CACHE_TIMEOUT)
+        if timeout > 0:
+            consumed_key = self.context['consumed_key']
+            transaction.on_commit(lambda: cache.set(consumed_key, True, timeout=timeout))
+
+        logger.info(
+            'account_verification outcome=%s decode_ms=%.2f update_ms=%.2f',
+            'verified' if updated else 'already_verified',
+            self.context['decode_time'] * 1000,
+            update_time * 1000
+        )
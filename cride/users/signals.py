@@ -0,0 +1,54 @@
+"""Users signals."""
+
+# Django
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# Django REST Framework
+from rest_framework.authtoken.models import Token
+
+# Models
+from cride.users.models import Profile, User
+
+# Authentication
+from cride.users.authentication import invalidate_token, invalidate_user_tokens
+
+# Leaderboards
+from cride.utils import leaderboards
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token once its deletion is committed.
+
+    Dropped earlier, a request could cache the token again before the
+    row is gone.
+    """
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user_tokens(sender, instance, created, **kwargs):
+    """Drop the cached tokens of a user once its changes are committed.
+
+    Cached tokens hold the user fields, which must not outlive a
+    password change or a deactivation.
+    """
+    if not created:
+        user_pk = instance.pk
+        transaction.on_commit(lambda: invalidate_user_tokens(user_pk))
+
+
+@receiver(post_save, sender=Profile)
+def rank_profile(sender, instance, created, **kwargs):
+    """Add new profiles to the reputation leaderboard once committed."""
+    if created:
+        transaction.on_commit(lambda: leaderboards.sync(instance))
+
+
+@receiver(post_delete, sender=Profile)
+def unrank_profile(sender, instance, **kwargs):
+    """Remove deleted profiles from the reputation leaderboard once committed."""
+    transaction.on_commit(lambda: leaderboards.discard(instance))
@@ -0,0 +1,67 @@
+"""Users authentication tests."""
+
+# Django
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+
+# Django REST Framework
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+# Models
+from cride.users.models import Profile, User
+
+# Authentication
+from cride.users.authentication import get_token_cache_key
+
+
+class CachedTokenMixin:
+    """Create a user with a token and a client sending it."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@cride.com',
+            username='test',
+            password='admin123',
+            first_name='Test',
+            last_name='User',
+            is_verified=True
+        )
+        Profile.objects.create(user=self.user)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token {}'.format(self.token.key))
+        self.url = '/users/{}/'.format(self.user.username)
+
+
+class CachedTokenAuthenticationTestCase(CachedTokenMixin, TestCase):
+    """Cached token authentication test case."""
+
+    def test_cached_token_skips_the_database(self):
+        """Once cached, the token and its user are not read again."""
+        self.client.get(self.url, {'exclude': 'circles'})
+        # Conditional GET timestamp, user with profile.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'exclude': 'circles'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'test')
+
+
+class CachedTokenInvalidationTestCase(CachedTokenMixin, TransactionTestCase):
+    """Cached token invalidation test case, committing every change."""
+
+    def test_saving_the_user_drops_its_tokens(self):
+        """Password changes and deactivations apply to cached tokens."""
+        self.client.get(self.url)
+        self.assertIsNotNone(cache.get(get_token_cache_key(self.token.key)))
+
+        self.user.set_password('newpass123')
+        self.user.save()
+        self.assertIsNone(cache.get(get_token_cache_key(self.token.key)))
+
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,99 @@
+"""Users views tests."""
+
+# Django
+from django.core.cache import cache
+from django.test import TestCase
+
+# Django REST Framework
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+# Models
+from cride.circles.models import Circle, Membership
+from cride.users.models import Profile, User
+
+
+class UserDetailTestCase(TestCase):
+    """Base test case requesting the detail of a user as the user."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@cride.com',
+            username='test',
+            password='admin123',
+            first_name='Test',
+            last_name='User',
+            is_client=True,
+            is_verified=True
+        )
+        self.profile = Profile.objects.create(user=self.user)
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token {}'.format(token.key))
+        self.url = '/users/{}/'.format(self.user.username)
+
+    def join_circles(self, count):
+        """Make the user an active member of `count` new circles."""
+        start = Circle.objects.count()
+        for i in range(start, start + count):
+            circle = Circle.objects.create(name='Circle {}'.format(i), slug_name='circle-{}'.format(i))
+            Membership.objects.create(user=self.user, profile=self.profile, circle=circle)
+
+    def get_detail(self):
+        """Request the user detail without the token cache."""
+        cache.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class UserDetailQueriesTestCase(UserDetailTestCase):
+    """User detail queries test case."""
+
+    def test_queries_do_not_grow_with_memberships(self):
+        """The detail takes the same queries for 1 or 30 circles."""
+        self.join_circles(1)
+        # Token, conditional GET timestamp, user with profile, memberships with circles.
+        with self.assertNumQueries(4):
+            response = self.get_detail()
+        self.assertEqual(len(response.data['circles']), 1)
+
+        self.join_circles(29)
+        with self.assertNumQueries(4):
+            response = self.get_detail()
+        self.assertEqual(len(response.data['circles']), 30)
+
+
+class UserDetailFieldsetsTestCase(UserDetailTestCase):
+    """User detail sparse fieldsets test case."""
+
+    def test_fields_pick_payload_keys(self):
+        """?fields= and ?exclude= select the user and circles keys."""
+        self.join_circles(2)
+        response = self.client.get(self.url, {'fields': 'circles'})
+        self.assertEqual(list(response.data), ['circles'])
+        self.assertEqual(len(response.data['circles']), 2)
+
+        response = self.client.get(self.url, {'exclude': 'circles'})
+        self.assertEqual(list(response.data), ['user'])
+        self.assertEqual(response.data['user']['username'], 'test')
+
+    def test_user_only_skips_memberships(self):
+        """Without circles, the memberships are not loaded."""
+        self.join_circles(2)
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'fields': 'user'})
+
+    def test_unknown_payload_keys(self):
+        """Names other than the payload keys are answered with a 400."""
+        response = self.client.get(self.url, {'fields': 'user,email'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data['fields'][0])
+
+    def test_unknown_fields(self):
+        """Names the serializer doesn't have are answered with a 400."""
+        response = self.client.get('/users/search/', {'q': 'test', 'exclude': 'password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.data['exclude'][0])
@@ -1,12 +1,15 @@
 """Users views."""
 
+# Django
+from django.db.models import Prefetch
+
 # Django REST Framework we use viewsets form implements actions.
 from rest_framework import status, viewsets, mixins
 from rest_framework.response import Response
 
 # Models
 from cride.users.models import User
-from cride.circles.models import Circle
+from cride.circles.models import Membership
 
 # Permissions
 from rest_framework.permissions import (
@@ -20,24 +23,85 @@ from cride.users.permissions import IsAccountOwner
 # Actions
 from rest_framework.decorators import action
 
+# Utilities
+from cride.utils import leaderboards
+from cride.utils.search import search_results
+from cride.utils.serializers import check_fieldset, parse_fieldset
+from cride.utils.views import ConditionalGetMixin, InstrumentedViewSetMixin, SparseFieldsetsViewMixin
+
 # Serializers
 from cride.users.serializers.profiles import ProfileModelSerializer
 from cride.circles.serializers import CircleModelSerializer
 from cride.users.serializers import (
     UserLoginSerializer,
     UserModelSerializer,
+    UserSearchSerializer,
     UserSignUpSerializer,
     AccountVerificationSerializer
 )
 
-class UserViewSet(viewsets.GenericViewSet, mixins.RetrieveModelMixin, mixins.UpdateModelMixin):
+class UserViewSet(
+    InstrumentedViewSetMixin,
+    ConditionalGetMixin,
+    SparseFieldsetsViewMixin,
+    viewsets.GenericViewSet,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin
+):
     """User view set.
     Handle sign up, login and account verification.
     """
 
-    queryset = User.objects.filter(is_active=True, is_client=True)
     serializer_class = UserModelSerializer
     lookup_field = 'username'
+    conditional_actions = ('retrieve',)
+    modified_lookups = ('modified', 'profile__modified', 'membership__modified', 'membership__circle__modified')
+    retrieve_keys = ('user', 'circles')
+
+    def get_queryset(self):
+        """Plan the queries needed by each action.
+
+        Retrieve loads the user and its profile in one query and every
+        active membership with its circle in a second one, no matter how
+        many circles the user belongs to.
+        """
+        queryset = User.objects.filter(is_active=True, is_client=True).defer('search_vector')
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('profile')
+            if 'circles' not in self.get_retrieve_keys():
+                return queryset
+            memberships = Membership.objects.filter(
+                is_active=True
+            ).select_related('circle').order_by(
+                '-circle__rides_taken',
+                '-circle__rides_offered'
+            )
+            queryset = queryset.prefetch_related(
+                Prefetch('membership_set', queryset=memberships, to_attr='active_memberships')
+            )
+        return queryset
+
+    def get_retrieve_keys(self):
+        """Return the keys of the retrieve payload picked with ?fields= and ?exclude=."""
+        fieldset = parse_fieldset(self.request)
+        if fieldset is None:
+            return self.retrieve_keys
+        check_fieldset(fieldset, self.retrieve_keys)
+        only, exclude = fieldset
+        return [key for key in self.retrieve_keys if (not only or key in only) and key not in exclude]
+
+    def get_serializer_context(self):
+        context = super(UserViewSet, self).get_serializer_context()
+        if self.action == 'retrieve':
+            # The fieldset picks the keys of the payload, see retrieve().
+            context['sparse_fieldsets'] = False
+        return context
+
+    def get_validators(self):
+        """Validate only the account owner's requests, others get their 403."""
+        if self.kwargs.get(self.lookup_field) != self.request.user.username:
+            return None
+        return super(UserViewSet, self).get_validators()
 
     def get_permissions(self):
         """Assign permissions based on action."""
@@ -61,6 +125,47 @@ class UserViewSet(viewsets.GenericViewSet, mixins.RetrieveModelMixin, mixins.Upd
         }
         return Response(data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['POST'])
+    def logout(self, request):
+        """User logout.
+
+        Delete the access token, which also drops it from the cache.
+        """
+        request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['GET'])
+    def search(self, request):
+        """Search users by username and name."""
+        context = self.get_serializer_context()
+        users = search_results(
+            UserSearchSerializer(context=context).project_queryset(
+                User.objects.filter(is_active=True, is_client=True).select_related('profile').defer('search_vector')
+            ),
+            request.query_params.get('q', ''),
+            trigram_field='username'
+        )
+        serializer = self.instrument_serializer(UserSearchSerializer(users, many=True, context=context))
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def leaderboard(self, request):
+        """List the users with the best reputation and the requester's rank."""
+        top = leaderboards.get_top(
+            leaderboards.REPUTATION_KEY,
+            leaderboards.get_limit(request.query_params.get('limit'))
+        )
+        users = User.objects.only('username').in_bulk([pk for pk, _ in top])
+        results = [
+            {'rank': rank, 'username': users[pk].username, 'reputation': score}
+            for rank, (pk, score) in enumerate(top, 1)
+            if pk in users
+        ]
+        return Response({
+            'rank': leaderboards.get_reputation_rank(request.user.pk),
+            'results': results
+        })
+
     @action(detail=False, methods=['POST'])
     def signup(self, request):
         """User signup."""
@@ -83,19 +188,19 @@ class UserViewSet(viewsets.GenericViewSet, mixins.RetrieveModelMixin, mixins.Upd
 
     
     def retrieve(self, request, *args, **kwargs):
-        """Adds extra data to the response."""
-        response = super(UserViewSet, self).retrieve(request, *args, **kwargs)
-        circles = Circle.objects.filter(
-            members=request.user,
-            membership__is_active=True
-        )
-        data = {
-            'user': response.data,
-            'circles': CircleModelSerializer(circles, many=True).data
-        }
-    
-        response.data = data
-        return response
+        """Adds extra data to the response.
+
+        ?fields= and ?exclude= pick the `user` and `circles` keys.
+        """
+        keys = self.get_retrieve_keys()
+        user = self.get_object()
+        data = {}
+        if 'user' in keys:
+            data['user'] = self.get_serializer(user).data
+        if 'circles' in keys:
+            circles = [membership.circle for membership in user.active_memberships]
+            data['circles'] = self.instrument_serializer(CircleModelSerializer(circles, many=True)).data
+        return Response(data)
 
     @action(detail=True, methods=['PUT','PATCH'])
     def profile(self, request, *args, **kwargs):
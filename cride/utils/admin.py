@@ -0,0 +1,85 @@
+"""Admin utilities."""
+
+# Django
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+# Utilities
+from cride.utils.search import search
+
+
+def get_estimated_count(model, using='default'):
+    """Return the planner's row estimate of a model's table, or None.
+
+    Read from pg_class.reltuples, kept up to date by VACUUM and ANALYZE.
+    None is returned off PostgreSQL or when the table was never analyzed.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator estimating the count of unfiltered large tables.
+
+    An exact COUNT(*) scans the whole table. Unfiltered querysets of
+    tables estimated above ADMIN_ESTIMATED_COUNT_THRESHOLD rows report
+    the estimate instead; filtered ones are still counted.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = get_estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super(EstimatedCountPaginator, self).count
+
+
+class LargeTableAdminMixin:
+    """Changelist settings for tables with millions of rows.
+
+    Pages are counted with EstimatedCountPaginator and the full count
+    shown next to filtered results is skipped. Admins should also set
+    `list_select_related` for the relations shown in `list_display`.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class IndexedSearchAdminMixin:
+    """Run the admin search box through the full text and trigram indexes.
+
+    Replaces the ILIKE '%term%' queries built from `search_fields`,
+    which still have to be set for the search box to be shown.
+    """
+
+    search_vector_field = 'search_vector'
+    search_trigram_field = 'name'
+    search_exact_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        queryset = search(
+            queryset,
+            search_term,
+            vector_field=self.search_vector_field,
+            trigram_field=self.search_trigram_field,
+            exact_fields=self.search_exact_fields
+        )
+        return queryset, False
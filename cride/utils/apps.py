@@ -0,0 +1,11 @@
+"""Utilities app."""
+
+# Django
+from django.apps import AppConfig
+
+
+class UtilsAppConfig(AppConfig):
+    """Utilities app config."""
+
+    name = 'cride.utils'
+    verbose_name = 'Utilities'
@@ -0,0 +1,274 @@
+"""Benchmark utilities.
+
+Scenarios hitting the real endpoints over a seeded dataset (see
+cride.utils.seeding), two drivers to run them (the Django test client,
+in process, and a threaded HTTP load generator against a running
+server) and the helpers to summarize the samples and compare them with
+a stored baseline.
+"""
+
+# Django
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+# Django REST Framework
+from rest_framework.authtoken.models import Token
+
+# Models
+from cride.circles.models import Circle
+from cride.users.models import User
+
+# Utilities
+from cride.utils.seeding import PASSWORD
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import json
+import resource
+import sys
+import time
+import uuid
+
+
+class Scenario:
+    """Endpoint exercised by the benchmark.
+
+    `build` receives the dataset sample and the iteration number and
+    returns a (method, path, data, token) tuple.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+
+
+def build_circles_list(sample, number):
+    return 'GET', '/circles/', None, sample.pick_token(number)
+
+
+def build_circles_retrieve(sample, number):
+    return 'GET', '/circles/{}/'.format(sample.pick_circle(number)), None, sample.pick_token(number)
+
+
+def build_users_retrieve(sample, number):
+    username, token = sample.pick_user(number)
+    return 'GET', '/users/{}/'.format(username), None, token
+
+
+def build_users_login(sample, number):
+    return 'POST', '/users/login/', {'email': sample.pick_email(number), 'password': PASSWORD}, None
+
+
+def build_users_signup(sample, number):
+    username = 'bench{}'.format(uuid.uuid4().hex[:14])
+    return 'POST', '/users/signup/', {
+        'email': '{}@bench.comparteride.com'.format(username),
+        'username': username,
+        'phone_number': '+5215555555555',
+        'password': PASSWORD,
+        'password_confirmation': PASSWORD,
+        'first_name': 'Bench',
+        'last_name': 'User',
+    }, None
+
+
+SCENARIOS = [
+    Scenario('circles.list', build_circles_list),
+    Scenario('circles.retrieve', build_circles_retrieve),
+    Scenario('users.retrieve', build_users_retrieve),
+    Scenario('users.login', build_users_login),
+    Scenario('users.signup', build_users_signup),
+]
+
+
+class Sample:
+    """Users and circles of the seeded dataset the scenarios pick from."""
+
+    def __init__(self, size=100):
+        users = list(
+            User.objects.filter(username__startswith='seed_', is_verified=True)
+            .order_by('pk').values_list('pk', 'username', 'email')[:size]
+        )
+        if not users:
+            raise ValueError('The database holds no seeded users.')
+        self.users = [
+            (username, email, Token.objects.get_or_create(user_id=pk)[0].key)
+            for pk, username, email in users
+        ]
+        self.circles = list(
+            Circle.objects.filter(is_public=True).order_by('-rides_taken', '-rides_offered', '-id')
+            .values_list('slug_name', flat=True)[:size]
+        )
+        if not self.circles:
+            raise ValueError('The database holds no public circles.')
+
+    def pick_user(self, number):
+        username, _, token = self.users[number % len(self.users)]
+        return username, token
+
+    def pick_email(self, number):
+        return self.users[number % len(self.users)][1]
+
+    def pick_token(self, number):
+        return self.users[number % len(self.users)][2]
+
+    def pick_circle(self, number):
+        return self.circles[number % len(self.circles)]
+
+
+class ClientDriver:
+    """Run requests in process through the Django test client.
+
+    Every request is measured alone, so the query count is exact. Queries
+    are counted on every database alias, replicas included.
+    """
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST='localhost')
+
+    def run(self, scenario, sample, requests, warmup=0):
+        samples = []
+        for number in range(warmup + requests):
+            method, path, data, token = scenario.build(sample, number)
+            headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token)} if token else {}
+            with ExitStack() as stack:
+                captures = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                started = time.perf_counter()
+                response = self.client.generic(
+                    method, path,
+                    json.dumps(data) if data is not None else '',
+                    content_type='application/json',
+                    **headers
+                )
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError('{} {} answered {}.'.format(method, path, response.status_code))
+            if number >= warmup:
+                samples.append((elapsed, sum(len(queries) for queries in captures)))
+        return samples
+
+
+class HTTPDriver:
+    """Run requests concurrently against a running server.
+
+    Query counts are not available from outside the server process and
+    the peak RSS reported is the one of the load generator.
+    """
+
+    def __init__(self, url, concurrency=10):
+        self.url = url.rstrip('/')
+        self.concurrency = concurrency
+
+    def request(self, scenario, sample, number):
+        method, path, data, token = scenario.build(sample, number)
+        request = Request(
+            self.url + path,
+            data=json.dumps(data).encode() if data is not None else None,
+            method=method
+        )
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', 'Token {}'.format(token))
+        started = time.perf_counter()
+        try:
+            with urlopen(request) as response:
+                response.read()
+        except HTTPError as error:
+            raise RuntimeError('{} {} answered {}.'.format(method, path, error.code))
+        return time.perf_counter() - started, None
+
+    def run(self, scenario, sample, requests, warmup=0):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(lambda number: self.request(scenario, sample, number), range(warmup)))
+            return list(executor.map(
+                lambda number: self.request(scenario, sample, number),
+                range(warmup, warmup + requests)
+            ))
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    rank = max(int(-(-percent * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+def get_peak_rss():
+    """Return the peak resident set size of the process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def summarize(samples):
+    """Return the latency percentiles (ms) and queries of a scenario run."""
+    latencies = [elapsed * 1000 for elapsed, _ in samples]
+    queries = [count for _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'p50': round(percentile(latencies, 50), 2),
+        'p95': round(percentile(latencies, 95), 2),
+        'p99': round(percentile(latencies, 99), 2),
+        'queries': max(queries) if queries else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of a run against a baseline.
+
+    A scenario regresses when its p95 latency grows more than
+    `tolerance` (a fraction) or when it runs more queries per request.
+    """
+    regressions = []
+    for name, result in sorted(results['scenarios'].items()):
+        expected = baseline.get('scenarios', {}).get(name)
+        if expected is None:
+            continue
+        limit = expected['p95'] * (1 + tolerance)
+        if result['p95'] > limit:
+            regressions.append('{}: p95 {:.2f} ms, baseline {:.2f} ms (limit {:.2f} ms).'.format(
+                name, result['p95'], expected['p95'], limit
+            ))
+        if None not in (result['queries'], expected['queries']) and result['queries'] > expected['queries']:
+            regressions.append('{}: {} queries per request, baseline {}.'.format(
+                name, result['queries'], expected['queries']
+            ))
+    return regressions
+
+
+def run(driver, scenarios, sample, requests, warmup=0):
+    """Run every scenario and return the results document."""
+    results = {'scenarios': {}}
+    for scenario in scenarios:
+        results['scenarios'][scenario.name] = summarize(driver.run(scenario, sample, requests, warmup))
+    results['peak_rss_mb'] = round(get_peak_rss(), 1)
+    return results
+
+
+def select(names):
+    """Return the scenarios with the given names, or all of them."""
+    if not names:
+        return list(SCENARIOS)
+    known = {scenario.name: scenario for scenario in SCENARIOS}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValueError('Unknown scenarios: {}.'.format(', '.join(unknown)))
+    return [known[name] for name in names]
+
+
+def format_results(results):
+    """Yield the lines of a results table."""
+    yield '{:<20} {:>8} {:>10} {:>10} {:>10} {:>8}'.format(
+        'scenario', 'requests', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'queries'
+    )
+    for name, result in sorted(results['scenarios'].items()):
+        yield '{:<20} {:>8} {:>10.2f} {:>10.2f} {:>10.2f} {:>8}'.format(
+            name, result['requests'], result['p50'], result['p95'], result['p99'],
+            '-' if result['queries'] is None else result['queries']
+        )
+    yield 'peak RSS: {} MB'.format(results['peak_rss_mb'])
@@ -0,0 +1,205 @@
+"""Bulk loading utilities.
+
+Helpers to stream rows into PostgreSQL with COPY FROM STDIN instead of
+one INSERT per object: rows are built from unsaved model instances so
+field defaults and conversions match the ORM, and are encoded in the
+COPY text format as they are read, so memory stays flat however many
+rows are loaded.
+"""
+
+# Django
+from django.contrib.postgres.search import SearchVectorField
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+# Utilities
+from collections import defaultdict
+
+
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def get_copy_fields(model, with_pk=True):
+    """Return the concrete fields of a model written by COPY.
+
+    Search vectors are left to the triggers maintaining them and the
+    primary key to its sequence unless `with_pk` is given.
+    """
+    return [
+        field for field in model._meta.concrete_fields
+        if not isinstance(field, SearchVectorField) and (with_pk or not field.primary_key)
+    ]
+
+
+def encode_value(value):
+    """Return a value in the COPY text format."""
+    if value is None:
+        return '\\N'
+    return str(value).translate(COPY_ESCAPES)
+
+
+def get_row(instance, fields, connection, raw=False):
+    """Return the database values of an unsaved instance.
+
+    Like Model.save(), auto_now fields are set unless `raw` is given,
+    as when loading fixtures.
+    """
+    return [
+        field.get_db_prep_save(
+            getattr(instance, field.attname) if raw else field.pre_save(instance, True),
+            connection
+        )
+        for field in fields
+    ]
+
+
+class CopyStream:
+    """File-like object reading COPY text lines from an iterable of rows."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        pieces = [self.buffer]
+        length = len(self.buffer)
+        for row in self.rows:
+            line = '\t'.join(encode_value(value) for value in row) + '\n'
+            pieces.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        data = ''.join(pieces)
+        if size < 0:
+            self.buffer = ''
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(model, columns, rows, using='default'):
+    """Stream rows of values for `columns` into a model's table."""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns)
+    )
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(sql, CopyStream(rows))
+
+
+def copy_instances(model, instances, using='default', raw=False, with_pk=True):
+    """Stream unsaved instances of a model into its table."""
+    connection = connections[using]
+    fields = get_copy_fields(model, with_pk=with_pk)
+    copy_rows(
+        model,
+        [field.column for field in fields],
+        (get_row(instance, fields, connection, raw=raw) for instance in instances),
+        using=using
+    )
+
+
+def get_secondary_indexes(model, using='default'):
+    """Return the (name, definition) of the indexes of a model's table.
+
+    Indexes backing constraints (primary key, unique) are left out:
+    they keep the loaded data consistent.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+            AND indexname NOT IN (
+                SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass
+            )
+            ORDER BY indexname
+            """,
+            [model._meta.db_table, connections[using].ops.quote_name(model._meta.db_table)]
+        )
+        return cursor.fetchall()
+
+
+def drop_indexes(indexes, using='default'):
+    """Drop indexes, by (name, definition)."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for name, _ in indexes:
+            cursor.execute('DROP INDEX IF EXISTS {}'.format(connection.ops.quote_name(name)))
+
+
+def create_index(definition, using='default'):
+    """Run a CREATE INDEX statement."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(definition)
+
+
+def reserve_pks(model, count, using='default'):
+    """Allocate `count` consecutive primary keys of a model from its sequence.
+
+    The sequence is moved past the range in one statement, so rows
+    inserted meanwhile, by other workers or requests, take keys after
+    it instead of clashing with the COPY. A sequence lagging behind the
+    table, after rows were loaded with explicit keys, is caught up
+    first. Return the first key of the range.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT setval(sequence, GREATEST(
+                nextval(sequence), (SELECT COALESCE(MAX({column}), 0) + 1 FROM {table})
+            ) + %s, false) - %s
+            FROM pg_get_serial_sequence(%s, %s) AS sequence
+            """.format(column=quote(column), table=table),
+            [count, count, model._meta.db_table, column]
+        )
+        return cursor.fetchone()[0]
+
+
+def reset_sequences(models, using='default'):
+    """Move the primary key sequences of models past their loaded rows."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def analyze(models, using='default'):
+    """Refresh the planner statistics of models' tables."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute('ANALYZE {}'.format(connection.ops.quote_name(model._meta.db_table)))
+
+
+def load_fixture(path, using='default'):
+    """Load a JSON fixture with one COPY per model instead of one save per object.
+
+    Like loaddata, objects are loaded raw: no signals are sent and
+    their fields are stored as given. Unlike loaddata, existing rows
+    are not updated, the fixture must only hold new objects. Return
+    the number of objects loaded per model label.
+    """
+    connection = connections[using]
+    with open(path) as fixture:
+        objects = serializers.deserialize('json', fixture, using=using)
+        instances = defaultdict(list)
+        for deserialized in objects:
+            instances[deserialized.object.__class__].append(deserialized.object)
+
+    with transaction.atomic(using=using):
+        for model, batch in instances.items():
+            if connection.vendor == 'postgresql':
+                copy_instances(model, batch, using=using, raw=True)
+            else:
+                model.objects.using(using).bulk_create(batch)
+        if connection.vendor == 'postgresql':
+            reset_sequences(list(instances), using=using)
+    return {model._meta.label_lower: len(batch) for model, batch in instances.items()}
@@ -0,0 +1,226 @@
+"""Stat counters.
+
+Increments to stat fields (rides_taken, rides_offered...)
+are accumulated in Redis hashes instead of being written to Postgres
+right away, so hot rows are not locked by every ride. The flush task
+moves the accumulated deltas to the database periodically using one
+UPDATE ... SET field = field + delta statement per batch of rows.
+
+Each flush gets an id, recorded along with the deltas in the same
+database transaction: a flush retried after a crash between the commit
+and the cleanup of its Redis hash is not applied twice.
+"""
+
+# Django
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.utils import timezone
+
+# Redis
+from redis.exceptions import ConnectionError, ResponseError
+
+# Models
+from cride.utils.models import CounterFlush
+
+# Utilities
+from cride.utils import leaderboards
+from cride.utils.redis_client import acquire_lock, get_redis, release_lock
+from contextlib import contextmanager
+from datetime import timedelta
+import time
+import uuid
+
+
+PENDING_KEY = 'counters:pending:{label}'
+FLUSHING_KEY = 'counters:flushing:{label}'
+FLUSH_LOCK_KEY = 'counters:lock'
+
+# Field of the flushing hashes holding their flush id.
+FLUSH_ID_FIELD = '_id'
+
+# Flushes are retried every few seconds, their ids are kept way longer.
+FLUSH_RETENTION = timedelta(days=1)
+
+# Seconds between attempts to take the lock of a running flush.
+FLUSH_LOCK_POLL = 0.1
+
+
+def _get_label(model):
+    """Return the label identifying a model's counters."""
+    return model._meta.label_lower
+
+
+def _is_float(model, field):
+    """Return whether a counter field holds floats."""
+    return isinstance(model._meta.get_field(field), FloatField)
+
+
+def increment(instance, field, amount=1):
+    """Add `amount` to a stat field of the given instance.
+
+    The leaderboard the instance is ranked in is updated in the same
+    round trip.
+    """
+    model = type(instance)
+    if field not in settings.COUNTERS[_get_label(model)]:
+        raise ValueError('{} is not a counter of {}'.format(field, _get_label(model)))
+
+    key = PENDING_KEY.format(label=_get_label(model))
+    member = '{}:{}'.format(instance.pk, field)
+    pipe = get_redis().pipeline(transaction=True)
+    if _is_float(model, field):
+        pipe.hincrbyfloat(key, member, amount)
+    else:
+        pipe.hincrby(key, member, amount)
+    leaderboards.record(pipe, instance, field, amount)
+    pipe.execute()
+
+
+def get_pending(instances):
+    """Return the deltas not yet flushed of the given instances.
+
+    Every instance must be of the same model. A list with one
+    {field: delta} dict per instance is returned, using a single round
+    trip to Redis no matter how many instances are given. If Redis is
+    unreachable no delta is reported.
+    """
+    if not instances:
+        return []
+
+    model = type(instances[0])
+    label = _get_label(model)
+    fields = settings.COUNTERS[label]
+    members = ['{}:{}'.format(instance.pk, field) for instance in instances for field in fields]
+
+    # MULTI/EXEC: a flush renaming the pending hash between both reads
+    # would have its deltas counted twice.
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.hmget(PENDING_KEY.format(label=label), members)
+    pipe.hmget(FLUSHING_KEY.format(label=label), [FLUSH_ID_FIELD] + members)
+    try:
+        pending, (flush_id, *flushing) = pipe.execute()
+    except ConnectionError:
+        return [{} for instance in instances]
+
+    # Deltas being flushed are in the database as soon as their flush commits.
+    if flush_id is not None and CounterFlush.objects.filter(pk=flush_id.decode()).exists():
+        flushing = [None] * len(members)
+
+    values = iter(zip(pending, flushing))
+    deltas = []
+    for instance in instances:
+        instance_deltas = {}
+        for field in fields:
+            cast = float if _is_float(model, field) else int
+            delta = sum(cast(value) for value in next(values) if value is not None)
+            if delta:
+                instance_deltas[field] = delta
+        deltas.append(instance_deltas)
+    return deltas
+
+
+def flush():
+    """Write every pending delta to the database.
+
+    Return a dict with the number of rows updated per model label, or
+    None if another flush is already running.
+    """
+    token = acquire_lock(FLUSH_LOCK_KEY, settings.CELERYD_TASK_TIME_LIMIT)
+    if token is None:
+        return None
+
+    try:
+        return _flush(get_redis())
+    finally:
+        release_lock(FLUSH_LOCK_KEY, token)
+
+
+@contextmanager
+def hold_flushes(timeout):
+    """Flush every pending delta, then keep flushes out until the block exits.
+
+    Meanwhile increments stay in the pending hashes and the counted
+    fields don't change in the database. Waits for a running flush to
+    finish first; the hold is released after `timeout` seconds anyway.
+    """
+    token = acquire_lock(FLUSH_LOCK_KEY, timeout)
+    while token is None:
+        time.sleep(FLUSH_LOCK_POLL)
+        token = acquire_lock(FLUSH_LOCK_KEY, timeout)
+
+    try:
+        _flush(get_redis())
+        yield
+    finally:
+        release_lock(FLUSH_LOCK_KEY, token)
+
+
+def parse_deltas(model, members):
+    """Return the {pk: {field: delta}} dict of the members of a counters hash."""
+    deltas = {}
+    for member, value in members.items():
+        pk, field = member.decode().split(':')
+        cast = float if _is_float(model, field) else int
+        deltas.setdefault(int(pk), {})[field] = cast(value)
+    return deltas
+
+
+def _flush(client):
+    """Move the pending deltas of every counted model to the database."""
+    updated = {}
+    for label, fields in settings.COUNTERS.items():
+        pending_key = PENDING_KEY.format(label=label)
+        flushing_key = FLUSHING_KEY.format(label=label)
+
+        # Leftovers of a failed flush are retried before taking new deltas.
+        if not client.exists(flushing_key):
+            try:
+                client.rename(pending_key, flushing_key)
+            except ResponseError:
+                # No pending deltas.
+                continue
+
+        # Kept by a retried flush, so it can tell whether it was applied.
+        client.hsetnx(flushing_key, FLUSH_ID_FIELD, uuid.uuid4().hex)
+        members = client.hgetall(flushing_key)
+        flush_id = uuid.UUID(members.pop(FLUSH_ID_FIELD.encode()).decode())
+
+        model = apps.get_model(label)
+        deltas = parse_deltas(model, members)
+        if _apply(model, fields, deltas, flush_id):
+            updated[label] = len(deltas)
+        client.delete(flushing_key)
+    return updated
+
+
+def _apply(model, fields, deltas, flush_id):
+    """Apply the deltas of a model in batched UPDATE statements.
+
+    Return False if the flush was already applied.
+    """
+    pks = sorted(deltas)
+    batch_size = settings.COUNTERS_FLUSH_BATCH_SIZE
+    with transaction.atomic():
+        if CounterFlush.objects.filter(pk=flush_id).exists():
+            return False
+        CounterFlush.objects.filter(created__lt=timezone.now() - FLUSH_RETENTION).delete()
+        CounterFlush.objects.create(pk=flush_id, label=_get_label(model))
+
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            changes = {}
+            for field in fields:
+                output_field = FloatField() if _is_float(model, field) else IntegerField()
+                whens = [
+                    When(pk=pk, then=Value(deltas[pk][field]))
+                    for pk in batch if deltas[pk].get(field)
+                ]
+                if whens:
+                    changes[field] = F(field) + Case(*whens, default=Value(0), output_field=output_field)
+            if changes:
+                # update() skips auto_now, keep `modified` (and ETags) current.
+                changes['modified'] = timezone.now()
+                model.objects.filter(pk__in=batch).update(**changes)
+        return True
@@ -0,0 +1,143 @@
+"""Images utilities.
+
+Uploaded pictures are written to a staging storage during the request
+and processed later by the process_image task: metadata is stripped,
+the image is downscaled and fixed-size JPEG/WebP variants are rendered
+and stored next to it in the field's storage.
+"""
+
+# Django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+# Pillow
+from PIL import Image, ImageOps
+
+# Utilities
+from io import BytesIO
+import os
+import posixpath
+import uuid
+
+
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+
+def get_staging_storage():
+    """Return the storage holding uploads waiting to be processed."""
+    return FileSystemStorage(location=settings.IMAGE_STAGING_ROOT)
+
+
+def stage_image(upload):
+    """Save an uploaded image to the staging storage and return its name."""
+    extension = os.path.splitext(upload.name)[1].lower()
+    return get_staging_storage().save(uuid.uuid4().hex + extension, upload)
+
+
+def get_variant_name(name, variant, format):
+    """Return the storage name of an image variant."""
+    root = os.path.splitext(name)[0]
+    return '{}_{}.{}'.format(root, variant, FORMATS[format][1])
+
+
+def get_variant_urls(field_file):
+    """Return the URLs of every variant of an image, or None."""
+    if not field_file:
+        return None
+    storage = field_file.storage
+    return {
+        variant: {
+            format: storage.url(get_variant_name(field_file.name, variant, format))
+            for format in FORMATS
+        }
+        for variant in settings.IMAGE_VARIANTS
+    }
+
+
+def encode(image, format):
+    """Return the bytes of an image encoded without metadata."""
+    output = BytesIO()
+    image.save(output, FORMATS[format][0], quality=settings.IMAGE_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def render(source):
+    """Return the processed image and its variants.
+
+    The result maps (variant, format) pairs to the encoded bytes; the
+    downscaled original is stored under the None variant.
+    """
+    image = Image.open(source)
+    # Apply the EXIF orientation before the metadata is dropped.
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((settings.IMAGE_MAX_SIZE, settings.IMAGE_MAX_SIZE), Image.LANCZOS)
+
+    rendered = {(None, 'jpeg'): encode(image, 'jpeg')}
+    for variant, size in settings.IMAGE_VARIANTS.items():
+        thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+        for format in FORMATS:
+            rendered[(variant, format)] = encode(thumbnail, format)
+    return rendered
+
+
+def is_staged(staged_name):
+    """Return whether a staged upload is still waiting to be processed."""
+    return get_staging_storage().exists(staged_name)
+
+
+def discard_staged_image(staged_name):
+    """Delete a staged upload that won't be processed."""
+    get_staging_storage().delete(staged_name)
+
+
+def process_staged_image(instance, field_name, staged_name):
+    """Process a staged upload and store it in the instance's image field.
+
+    The field is updated with a single UPDATE so other columns written
+    meanwhile are not overwritten. The previous image and its variants
+    are deleted, and so is the staged file. If anything fails, the
+    files already stored are deleted and the staged file is kept so the
+    processing can be retried.
+    """
+    field = instance._meta.get_field(field_name)
+    storage = field.storage
+    staging = get_staging_storage()
+
+    with staging.open(staged_name) as source:
+        rendered = render(source)
+
+    stored = []
+    try:
+        name = storage.save(
+            posixpath.join(field.upload_to, uuid.uuid4().hex + '.jpg'),
+            ContentFile(rendered.pop((None, 'jpeg')))
+        )
+        stored.append(name)
+        for (variant, format), content in rendered.items():
+            stored.append(storage.save(get_variant_name(name, variant, format), ContentFile(content)))
+
+        previous = getattr(instance, field_name)
+        type(instance).objects.filter(pk=instance.pk).update(**{field_name: name, 'modified': timezone.now()})
+    except Exception:
+        for stored_name in stored:
+            storage.delete(stored_name)
+        raise
+
+    if previous:
+        delete_image(previous)
+    staging.delete(staged_name)
+    return name
+
+
+def delete_image(field_file):
+    """Delete an image and all of its variants from storage."""
+    storage = field_file.storage
+    for variant in settings.IMAGE_VARIANTS:
+        for format in FORMATS:
+            storage.delete(get_variant_name(field_file.name, variant, format))
+    storage.delete(field_file.name)
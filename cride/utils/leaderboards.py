@@ -0,0 +1,316 @@
+"""Leaderboards.
+
+Rankings kept in Redis sorted sets so top lists and rank lookups don't
+sort the tables:
+
+    leaderboards:circles                    Public circles.
+    leaderboards:circle:<pk>:members        Active members of a circle, by user.
+    leaderboards:users:reputation           Users by profile reputation.
+
+Circles and members are ranked like the Circle ordering, by rides taken
+then rides offered, packed in a single score. Scores are incremented
+along with the stat counters (see cride.utils.counters) and members are
+added or removed by signals once their transaction commits; rebuild()
+recomputes everything from the database.
+"""
+
+# Django
+from django.apps import apps
+from django.conf import settings
+
+# Redis
+from redis.exceptions import ConnectionError, WatchError
+
+# Utilities
+from cride.utils.redis_client import acquire_lock, get_redis, release_lock
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Rides offered take the low bits of the score. Scores are doubles, so
+# rides taken are exact up to 2 ** 27.
+SCALE = 2 ** 26
+
+CIRCLES_KEY = 'leaderboards:circles'
+CIRCLE_MEMBERS_KEY = 'leaderboards:circle:{circle_pk}:members'
+REPUTATION_KEY = 'leaderboards:users:reputation'
+REBUILD_PREFIX = 'leaderboards:rebuild:'
+REBUILD_LOCK_KEY = 'leaderboards:lock'
+
+RIDES_WEIGHTS = {'rides_taken': SCALE, 'rides_offered': 1}
+REPUTATION_WEIGHTS = {'reputation': 1}
+
+
+def get_rides_score(rides_taken, rides_offered):
+    """Return the score ranking by rides taken, then rides offered."""
+    return rides_taken * SCALE + rides_offered
+
+
+def split_rides_score(score):
+    """Return the (rides_taken, rides_offered) packed in a score."""
+    return divmod(int(score), SCALE)
+
+
+def get_entry(instance):
+    """Return the (key, member, weights) of the leaderboard an instance is ranked in."""
+    label = instance._meta.label_lower
+    if label == 'circles.circle':
+        return CIRCLES_KEY, instance.pk, RIDES_WEIGHTS
+    if label == 'circles.membership':
+        return CIRCLE_MEMBERS_KEY.format(circle_pk=instance.circle_id), instance.user_id, RIDES_WEIGHTS
+    if label == 'users.profile':
+        return REPUTATION_KEY, instance.user_id, REPUTATION_WEIGHTS
+    return None
+
+
+def get_score(instance):
+    """Return the score of an instance from its field values."""
+    _, _, weights = get_entry(instance)
+    return sum(getattr(instance, field) * weight for field, weight in weights.items())
+
+
+def is_ranked(instance):
+    """Return whether an instance belongs in its leaderboard."""
+    label = instance._meta.label_lower
+    if label == 'circles.circle':
+        return instance.is_public
+    if label == 'circles.membership':
+        return instance.is_active
+    return True
+
+
+def record(pipe, instance, field, amount):
+    """Queue the score change of a stat increment on a Redis pipeline.
+
+    Only members already ranked are updated (ZADD XX INCR), so private
+    circles or inactive members are never added by an increment.
+    """
+    entry = get_entry(instance)
+    if entry is None:
+        return
+    key, member, weights = entry
+    if field in weights:
+        pipe.zadd(key, {member: amount * weights[field]}, xx=True, incr=True)
+
+
+def sync(instance):
+    """Add an instance to its leaderboard or remove it, as it deserves.
+
+    Instances already ranked keep their score, which may include
+    increments not flushed to the database yet. Failures are logged:
+    rebuild() fixes the leaderboards afterwards.
+    """
+    key, member, _ = get_entry(instance)
+    try:
+        if is_ranked(instance):
+            get_redis().zadd(key, {member: get_score(instance)}, nx=True)
+        else:
+            get_redis().zrem(key, member)
+    except ConnectionError:
+        logger.warning('Could not update the %s leaderboard.', key)
+
+
+def sync_many(instances):
+    """Like sync(), for several instances in a single round trip.
+
+    Used after bulk_create(), which sends no post_save signal.
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    for instance in instances:
+        key, member, _ = get_entry(instance)
+        if is_ranked(instance):
+            pipe.zadd(key, {member: get_score(instance)}, nx=True)
+        else:
+            pipe.zrem(key, member)
+    try:
+        pipe.execute()
+    except ConnectionError:
+        logger.warning('Could not update the leaderboards of %s instances.', len(instances))
+
+
+def discard(instance):
+    """Remove a deleted instance from its leaderboard."""
+    key, member, _ = get_entry(instance)
+    client = get_redis()
+    try:
+        client.zrem(key, member)
+        if instance._meta.label_lower == 'circles.circle':
+            client.delete(CIRCLE_MEMBERS_KEY.format(circle_pk=instance.pk))
+    except ConnectionError:
+        logger.warning('Could not update the %s leaderboard.', key)
+
+
+def set_scores(key, scores):
+    """Set the scores of a {member: score} dict on a leaderboard.
+
+    Used by bulk jobs that write the ranked fields without saving the
+    instances. Failures are logged, like in sync().
+    """
+    if not scores:
+        return
+    try:
+        get_redis().zadd(key, scores)
+    except ConnectionError:
+        logger.warning('Could not update the %s leaderboard.', key)
+
+
+def get_limit(value, default=10):
+    """Return the number of entries requested, within LEADERBOARD_MAX_LIMIT."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, settings.LEADERBOARD_MAX_LIMIT))
+
+
+def get_top(key, limit, offset=0):
+    """Return the (member pk, score) pairs of a leaderboard, best first."""
+    entries = get_redis().zrevrange(key, offset, offset + limit - 1, withscores=True)
+    return [(int(member), score) for member, score in entries]
+
+
+def get_rank(key, member):
+    """Return the 1-based rank of a member, or None if it isn't ranked."""
+    rank = get_redis().zrevrank(key, member)
+    return None if rank is None else rank + 1
+
+
+def get_circle_rank(circle_pk):
+    """Return the rank of a public circle."""
+    return get_rank(CIRCLES_KEY, circle_pk)
+
+
+def get_member_rank(circle_pk, user_pk):
+    """Return the rank of a user among the members of a circle."""
+    return get_rank(CIRCLE_MEMBERS_KEY.format(circle_pk=circle_pk), user_pk)
+
+
+def get_reputation_rank(user_pk):
+    """Return the rank of a user by reputation."""
+    return get_rank(REPUTATION_KEY, user_pk)
+
+
+def rebuild(batch_size=None):
+    """Recompute every leaderboard from the database.
+
+    Leaderboards are built under temporary keys and renamed over the
+    live ones, so readers never see a partial ranking. Pending counter
+    deltas are flushed first so the database holds the current stats,
+    and further flushes wait until the rebuild is done: the increments
+    made meanwhile are still pending by then, and are added to the new
+    leaderboards in the transaction renaming them. Return the number of
+    entries per leaderboard kind, or None if another rebuild is running.
+    """
+    # Imported here: counters records its increments in the leaderboards.
+    from cride.utils import counters
+
+    token = acquire_lock(REBUILD_LOCK_KEY, settings.LEADERBOARD_REBUILD_TIME_LIMIT)
+    if token is None:
+        return None
+
+    try:
+        with counters.hold_flushes(settings.LEADERBOARD_REBUILD_TIME_LIMIT):
+            return _rebuild(get_redis(), batch_size or settings.LEADERBOARD_REBUILD_BATCH_SIZE)
+    finally:
+        release_lock(REBUILD_LOCK_KEY, token)
+
+
+def _rebuild(client, batch_size):
+    """Build the leaderboards under temporary keys and publish them."""
+    Circle = apps.get_model('circles', 'Circle')
+    Membership = apps.get_model('circles', 'Membership')
+    Profile = apps.get_model('users', 'Profile')
+
+    # Leftovers of an interrupted rebuild would be published with the new entries.
+    leftovers = list(client.scan_iter(REBUILD_PREFIX + '*'))
+    if leftovers:
+        client.delete(*leftovers)
+
+    sources = [
+        (
+            'circles',
+            Circle.objects.filter(is_public=True).values_list('pk', 'rides_taken', 'rides_offered'),
+            lambda pk, taken, offered: (CIRCLES_KEY, pk, get_rides_score(taken, offered)),
+        ),
+        (
+            'members',
+            Membership.objects.filter(is_active=True).values_list(
+                'circle_id', 'user_id', 'rides_taken', 'rides_offered'
+            ),
+            lambda circle_pk, user_pk, taken, offered: (
+                CIRCLE_MEMBERS_KEY.format(circle_pk=circle_pk), user_pk, get_rides_score(taken, offered)
+            ),
+        ),
+        (
+            'users',
+            Profile.objects.values_list('user_id', 'reputation'),
+            lambda user_pk, reputation: (REPUTATION_KEY, user_pk, reputation),
+        ),
+    ]
+
+    totals = {}
+    built = set()
+    for name, rows, get_item in sources:
+        totals[name] = 0
+        pipe = client.pipeline(transaction=False)
+        for row in rows.iterator(chunk_size=batch_size):
+            key, member, score = get_item(*row)
+            pipe.zadd(REBUILD_PREFIX + key, {member: score})
+            built.add(key)
+            totals[name] += 1
+            if totals[name] % batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+
+    _publish(client, built)
+    return totals
+
+
+def _publish(client, built):
+    """Rename the rebuilt leaderboards over the live ones.
+
+    The pending counter increments are added to the rebuilt entries in
+    the same transaction; if one comes in while they are read, the
+    transaction is retried.
+    """
+    from cride.utils import counters
+
+    pending_keys = [counters.PENDING_KEY.format(label=label) for label in settings.COUNTERS]
+    with client.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                pipe.watch(*pending_keys)
+                increments = _get_pending_increments(pipe, counters)
+                # Leaderboards left without entries.
+                stale = {CIRCLES_KEY, REPUTATION_KEY}
+                stale.update(key.decode() for key in client.scan_iter(CIRCLE_MEMBERS_KEY.format(circle_pk='*')))
+
+                pipe.multi()
+                for key, member, amount in increments:
+                    if key in built:
+                        pipe.zadd(REBUILD_PREFIX + key, {member: amount}, xx=True, incr=True)
+                for key in built:
+                    pipe.rename(REBUILD_PREFIX + key, key)
+                for key in stale - built:
+                    pipe.delete(key)
+                pipe.execute()
+                return
+            except WatchError:
+                continue
+
+
+def _get_pending_increments(client, counters):
+    """Return the (key, member, amount) score increments of the pending counter deltas."""
+    increments = []
+    for label in settings.COUNTERS:
+        model = apps.get_model(label)
+        deltas = counters.parse_deltas(model, client.hgetall(counters.PENDING_KEY.format(label=label)))
+        if not deltas:
+            continue
+        for pk, instance in model.objects.in_bulk(list(deltas)).items():
+            key, member, weights = get_entry(instance)
+            for field, delta in deltas[pk].items():
+                if field in weights:
+                    increments.append((key, member, delta * weights[field]))
+    return increments
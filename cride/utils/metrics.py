@@ -0,0 +1,286 @@
+"""Metrics utilities.
+
+A minimal in-process registry of counters and histograms exposed in
+the Prometheus text format. Every worker process keeps its own values,
+so a scraper has to hit each worker (or the single process on a local
+setup).
+
+Metrics recorded out of the web processes, like the Celery task ones,
+are kept in Redis instead (SharedHistogram) or read when rendered
+(CollectedGauge), so any web process exposes them.
+"""
+
+# Django
+from django.utils.module_loading import import_string
+
+# Utilities
+from bisect import bisect_left
+import json
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+TASK_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+TASK_RUN_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+
+def _format_labels(labels):
+    """Return the Prometheus representation of a labels tuple."""
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, value) for name, value in labels) + '}'
+
+
+class Counter:
+    """Monotonic counter."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield '{}{} {}'.format(self.name, _format_labels(labels), value)
+
+
+class Gauge:
+    """Value that goes up and down."""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield '{}{} {}'.format(self.name, _format_labels(labels), value)
+
+
+class Histogram:
+    """Histogram with fixed cumulative buckets."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self.values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket_labels = labels + (('le', bound),)
+                yield '{}_bucket{} {}'.format(self.name, _format_labels(bucket_labels), cumulative)
+            yield '{}_sum{} {}'.format(self.name, _format_labels(labels), total)
+            yield '{}_count{} {}'.format(self.name, _format_labels(labels), cumulative)
+
+
+class SharedHistogram(Histogram):
+    """Histogram kept in a Redis hash, shared by every process.
+
+    Fields are the JSON encoded labels followed by the bucket index, or
+    by "sum". Redis failures are logged and the observations lost.
+    """
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        super(SharedHistogram, self).__init__(name, documentation, buckets)
+        self.key = 'metrics:' + name
+
+    def observe(self, value, **labels):
+        # Imported here: the registry itself doesn't need Django settings.
+        from cride.utils.redis_client import get_redis
+        prefix = json.dumps(sorted(labels.items()), separators=(',', ':'))
+        index = bisect_left(self.buckets, value)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hincrby(self.key, '{}|{}'.format(prefix, index), 1)
+            pipe.hincrbyfloat(self.key, '{}|sum'.format(prefix), value)
+            pipe.execute()
+        except Exception:
+            logger.warning('Could not record the %s metric.', self.name)
+
+    def samples(self):
+        from cride.utils.redis_client import get_redis
+        try:
+            fields = get_redis().hgetall(self.key)
+        except Exception:
+            logger.warning('Could not read the %s metric.', self.name)
+            return
+        values = {}
+        for field, value in fields.items():
+            prefix, _, position = field.decode().rpartition('|')
+            labels = tuple(tuple(label) for label in json.loads(prefix))
+            counts, total = values.setdefault(labels, ([0] * (len(self.buckets) + 1), 0))
+            if position == 'sum':
+                values[labels] = (counts, float(value))
+            else:
+                counts[int(position)] = int(value)
+        with self.lock:
+            self.values = values
+        yield from super(SharedHistogram, self).samples()
+
+
+class CollectedGauge(Gauge):
+    """Gauge whose values are read when rendered.
+
+    `collect` is the dotted path of a function returning a
+    {labels dict as a tuple of pairs: value} dict.
+    """
+
+    def __init__(self, name, documentation, collect):
+        super(CollectedGauge, self).__init__(name, documentation)
+        self.collect = collect
+
+    def samples(self):
+        try:
+            values = import_string(self.collect)()
+        except Exception:
+            logger.warning('Could not collect the %s metric.', self.name)
+            return
+        with self.lock:
+            self.values = values
+        yield from super(CollectedGauge, self).samples()
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation):
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def shared_histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        return self.register(SharedHistogram(name, documentation, buckets))
+
+    def collected_gauge(self, name, documentation, collect):
+        return self.register(CollectedGauge(name, documentation, collect))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requests_total = registry.counter(
+    'cride_requests_total',
+    'Requests served by action, method and status.'
+)
+request_duration = registry.histogram(
+    'cride_request_duration_seconds',
+    'Total request latency by action.'
+)
+request_queries = registry.histogram(
+    'cride_request_queries',
+    'SQL queries run per request by action.',
+    buckets=QUERY_BUCKETS
+)
+request_db_duration = registry.histogram(
+    'cride_request_db_duration_seconds',
+    'Time spent running SQL queries per request by action.'
+)
+request_serialization_duration = registry.histogram(
+    'cride_request_serialization_seconds',
+    'Time spent serializing responses per request by action.'
+)
+query_budget_exceeded = registry.counter(
+    'cride_query_budget_exceeded_total',
+    'Requests that ran more SQL queries than their action budget.'
+)
+db_pool_connections = registry.gauge(
+    'cride_db_pool_connections',
+    'Pooled database connections by alias and state (in_use, idle).'
+)
+db_pool_waiters = registry.gauge(
+    'cride_db_pool_waiters',
+    'Threads waiting for a pooled database connection by alias.'
+)
+db_pool_wait_duration = registry.histogram(
+    'cride_db_pool_wait_seconds',
+    'Time spent checking out a pooled database connection by alias.'
+)
+db_pool_timeouts = registry.counter(
+    'cride_db_pool_timeouts_total',
+    'Database connection checkouts that timed out by alias.'
+)
+db_pool_discarded = registry.counter(
+    'cride_db_pool_discarded_total',
+    'Pooled database connections closed by alias and reason.'
+)
+task_wait_duration = registry.shared_histogram(
+    'cride_task_wait_seconds',
+    'Time Celery tasks waited in their queue before running, by task and queue.',
+    buckets=TASK_WAIT_BUCKETS
+)
+task_run_duration = registry.shared_histogram(
+    'cride_task_run_seconds',
+    'Celery task run time by task, queue and state.',
+    buckets=TASK_RUN_BUCKETS
+)
+task_queue_depth = registry.collected_gauge(
+    'cride_task_queue_depth',
+    'Messages waiting in each Celery queue.',
+    collect='cride.taskapp.celery.get_queue_depths'
+)
+circle_list_cache_requests = registry.collected_gauge(
+    'cride_circle_list_cache_requests',
+    'Public circle list pages served from the cache (hit) or built (miss), since the counters were created.',
+    collect='cride.circles.cache.get_list_stats'
+)
@@ -0,0 +1,159 @@
+"""Middleware utilities."""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+
+# Utilities
+from cride.utils import metrics
+from cride.utils.routers import choose_replica, use_replica
+from contextlib import ExitStack
+import hashlib
+import json
+import logging
+import time
+
+
+logger = logging.getLogger('cride.requests')
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries and their duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    """Record query count, DB time, serialization time and latency per request.
+
+    Requests are labeled with the action set by InstrumentedViewSetMixin
+    (e.g. CircleViewSet.list) or the URL name otherwise. Every request
+    emits a JSON log line on the cride.requests logger and feeds the
+    metrics served by the metrics view. Requests running more queries
+    than their QUERY_BUDGETS entry log a warning.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        request.serialization_time = 0.0
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        action = getattr(request, 'metrics_action', None)
+        if action is None:
+            match = getattr(request, 'resolver_match', None)
+            action = match.view_name if match else 'unresolved'
+
+        metrics.requests_total.inc(action=action, method=request.method, status=response.status_code)
+        metrics.request_duration.observe(duration, action=action)
+        metrics.request_queries.observe(counter.count, action=action)
+        metrics.request_db_duration.observe(counter.duration, action=action)
+        metrics.request_serialization_duration.observe(request.serialization_time, action=action)
+
+        logger.info(json.dumps({
+            'action': action,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': counter.count,
+            'db_ms': round(counter.duration * 1000, 2),
+            'serialization_ms': round(request.serialization_time * 1000, 2),
+            'total_ms': round(duration * 1000, 2),
+        }))
+
+        budget = settings.QUERY_BUDGETS.get(action)
+        if budget is not None and counter.count > budget:
+            metrics.query_budget_exceeded.inc(action=action)
+            logger.warning(
+                'Query budget exceeded by %s: %d queries, budget is %d.',
+                action, counter.count, budget
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests from a read replica, outside of a transaction.
+
+    Clients that wrote during the last REPLICA_PIN_TIMEOUT seconds keep
+    reading from the primary so they see their own writes; they are
+    recognized by a cookie or, for API clients, by their token. Must be
+    the last middleware: safe requests call the view from process_view,
+    which skips the ATOMIC_REQUESTS wrapper.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    PIN_KEY = 'replicas:pin:{}'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in self.SAFE_METHODS
+        if safe and not self.is_pinned(request):
+            use_replica(choose_replica())
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica(None)
+
+        if not safe and response.status_code < 400:
+            self.pin(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in self.SAFE_METHODS:
+            return view_func(request, *view_args, **view_kwargs)
+        return None
+
+    def get_pin_key(self, request):
+        """Return the cache key pinning the request's token, if any."""
+        authorization = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(authorization) != 2 or authorization[0].lower() != 'token':
+            return None
+        return self.PIN_KEY.format(hashlib.sha256(authorization[1].encode()).hexdigest())
+
+    def is_pinned(self, request):
+        if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            return True
+        key = self.get_pin_key(request)
+        return key is not None and cache.get(key) is not None
+
+    def pin(self, request, response):
+        """Keep the client on the primary for REPLICA_PIN_TIMEOUT seconds."""
+        timeout = settings.REPLICA_PIN_TIMEOUT
+        response.set_cookie(settings.REPLICA_PIN_COOKIE, '1', max_age=timeout, httponly=True)
+        key = self.get_pin_key(request)
+        if key is not None:
+            cache.set(key, True, timeout)
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """Compress responses of at least GZIP_MIN_LENGTH bytes.
+
+    Streaming responses are left alone: compressing them would buffer
+    the progress lines they stream.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super(ThresholdGZipMiddleware, self).process_response(request, response)
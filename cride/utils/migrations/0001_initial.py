@@ -0,0 +1,22 @@
+# Generated by Django 2.2.13 on 2026-10-17 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterFlush',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('label', models.CharField(max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+        ),
+    ]
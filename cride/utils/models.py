@@ -32,3 +32,21 @@ class CRideModel(models.Model):
 
         get_latest_by = 'created'
         ordering = ['-created', '-modified']
+
+
+class CounterFlush(models.Model):
+    """Counter flush model.
+
+    Records every batch of stat deltas moved from Redis to the
+    database, in the same transaction as the deltas themselves, so a
+    flush retried after a crash knows whether it was already applied.
+    See cride.utils.counters.
+    """
+
+    id = models.UUIDField(primary_key=True)
+    label = models.CharField(max_length=100)
+    created = models.DateTimeField('created at', auto_now_add=True)
+
+    def __str__(self):
+        """Return label and id."""
+        return '{} flush {}'.format(self.label, self.id)
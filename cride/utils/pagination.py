@@ -0,0 +1,161 @@
+"""Pagination utilities."""
+
+# Django
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+# Django REST Framework
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Utilities
+from collections import OrderedDict
+import json
+
+
+class KeysetPagination(BasePagination):
+    """Keyset pagination.
+
+    Pages are delimited by the ordering values of the first or last
+    row of the current page instead of an offset, so the database can
+    seek straight to the page through an index matching `ordering`.
+    Deep pages cost the same as the first one.
+
+    `ordering` must be unique, include the primary key as the
+    last field to break ties, and only hold integer fields.
+    """
+
+    ordering = ('-id',)
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = None
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of the queryset."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, capped to max_page_size."""
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, reverse):
+        """Return the ordering, flipping every field when paging backwards."""
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+
+    def get_keyset_filter(self, ordering, position):
+        """Return the filter selecting the rows that follow `position`.
+
+        The row comparison (a, b, c) > (x, y, z) is expanded to
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), plus a
+        redundant bound on the leading field so Postgres can run a range
+        scan on the index.
+        """
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+        leading_field, leading_desc = fields[0]
+        leading_lookup = '{}__{}'.format(leading_field, 'lte' if leading_desc else 'gte')
+        keyset_filter = Q()
+        for index, (field, descending) in enumerate(fields):
+            condition = Q(**{
+                '{}__{}'.format(field, 'lt' if descending else 'gt'): position[index]
+            })
+            for previous_index, (previous_field, _) in enumerate(fields[:index]):
+                condition &= Q(**{previous_field: position[previous_index]})
+            keyset_filter |= condition
+        return Q(**{leading_lookup: position[0]}) & keyset_filter
+
+    def get_position(self, instance):
+        """Return the ordering values of an instance."""
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, reverse, position):
+        """Return the URL for a cursor."""
+        cursor = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        encoded = urlsafe_base64_encode(cursor.encode())
+        if isinstance(encoded, bytes):
+            encoded = encoded.decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """Return the (reverse, position) pair of the request's cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            cursor = json.loads(urlsafe_base64_decode(encoded).decode())
+            reverse = bool(cursor['r'])
+            position = cursor['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # JSON booleans are ints to Python, but not to the database.
+        if any(isinstance(value, bool) or not isinstance(value, int) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def get_next_link(self):
+        """Return the link to the next page."""
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(False, self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        """Return the link to the previous page."""
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.get_position(self.page[0]))
+
+    def get_paginated_response(self, data):
+        """Return the page along with its navigation links."""
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -0,0 +1,52 @@
+"""Redis client utilities."""
+
+# Django
+from django.conf import settings
+
+# Redis
+import redis
+
+# Utilities
+import uuid
+
+
+_client = None
+
+
+def get_redis():
+    """Return the process-wide Redis client.
+
+    Used by features that need Redis data structures (hashes, sorted
+    sets) beyond what the Django cache API offers.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def acquire_lock(key, timeout):
+    """Take a lock expiring after `timeout` seconds.
+
+    Return the token needed to release it, or None if it is held.
+    """
+    token = uuid.uuid4().hex
+    if get_redis().set(key, token, nx=True, ex=timeout):
+        return token
+    return None
+
+
+def release_lock(key, token):
+    """Release a lock, unless it expired and was taken by someone else."""
+    with get_redis().pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.get(key) != token.encode():
+                pipe.unwatch()
+                return
+            pipe.multi()
+            pipe.delete(key)
+            pipe.execute()
+        except redis.WatchError:
+            # Changed hands in between, it's not ours anymore.
+            pass
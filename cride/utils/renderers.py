@@ -0,0 +1,29 @@
+"""Renderers utilities."""
+
+# Django REST Framework
+from rest_framework.renderers import JSONRenderer
+
+# Utilities
+import ujson
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with ujson.
+
+    Indented output (the browsable API, ?indent=) and data ujson can't
+    encode, such as lazy translation strings, fall back to the stock
+    renderer, which produces the same compact output.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        try:
+            content = ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, so the output is valid JavaScript.
+        content = content.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return content.encode()
@@ -0,0 +1,51 @@
+"""Database routers."""
+
+# Django
+from django.conf import settings
+
+# Utilities
+import random
+import threading
+
+
+_state = threading.local()
+
+
+def get_replicas():
+    """Return the aliases of the configured read replicas."""
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def use_replica(alias):
+    """Send the reads of the current thread to `alias`, or to the primary if None."""
+    _state.replica = alias
+
+
+def choose_replica():
+    """Return a random replica alias, or None when there are none."""
+    replicas = get_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """Route reads to a replica while ReplicaRoutingMiddleware allows it.
+
+    Writes, migrations and reads outside safe requests (tasks, commands,
+    writes' own reads) go to the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica is None or model._meta.label_lower in settings.REPLICA_EXCLUDED_MODELS:
+            return 'default'
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,50 @@
+"""Search utilities.
+
+Searches combine a prefix-matching full text query over a
+`search_vector` column (GIN index) with trigram similarity over a
+short text column (pg_trgm GIN index) to tolerate typos.
+"""
+
+# Django
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Q
+
+# Utilities
+import re
+
+
+def get_search_query(term):
+    """Return a query matching every word of `term` as a prefix, or None."""
+    words = re.findall(r'\w+', term.lower())
+    if not words:
+        return None
+    return SearchQuery(
+        ' & '.join('{}:*'.format(word) for word in words),
+        config='simple',
+        search_type='raw'
+    )
+
+
+def search(queryset, term, vector_field='search_vector', trigram_field='name', exact_fields=()):
+    """Return the rows of a queryset matching `term`, best matches first.
+
+    Rows whose `exact_fields` equal the whole term match as well, for
+    columns kept out of the search vector.
+    """
+    query = get_search_query(term)
+    if query is None:
+        return queryset.none()
+
+    matches = Q(**{vector_field: query}) | Q(**{'{}__trigram_similar'.format(trigram_field): term})
+    for field in exact_fields:
+        matches |= Q(**{field: term})
+    return queryset.annotate(
+        search_rank=SearchRank(F(vector_field), query),
+        search_similarity=TrigramSimilarity(trigram_field, term)
+    ).filter(matches).order_by('-search_rank', '-search_similarity')
+
+
+def search_results(queryset, term, **kwargs):
+    """Return the first SEARCH_RESULTS_LIMIT search results."""
+    return search(queryset, term, **kwargs)[:settings.SEARCH_RESULTS_LIMIT]
@@ -0,0 +1,263 @@
+"""Synthetic data utilities.
+
+Deterministic generators of users, profiles, circles and memberships
+used to seed benchmark and staging databases. Memberships follow a
+power law on both sides: most users belong to one or two circles, a
+few to dozens, and a handful of circles hold most of the members.
+
+seed() saves them through the ORM. bulk_seed() streams them into
+PostgreSQL with COPY from parallel worker processes, for datasets of
+tens of millions of rows.
+"""
+
+# Django
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+
+# Models
+from cride.circles.models import Circle, Membership
+from cride.users.models import Profile, User
+
+# Cache
+from cride.circles.cache import bump_list_version
+
+# Utilities
+from cride.utils import bulkload
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+import random
+
+
+PASSWORD = 'benchmark-password'
+USERNAME = 'seed_{:08d}'
+EMAIL = 'seed_{:08d}@seed.comparteride.com'
+SLUG_NAME = 'seed-{:08d}'
+
+
+def get_rng(seed):
+    """Return the random generator shared by every generator of a run."""
+    return random.Random(seed)
+
+
+def generate_users(count, rng, start=0):
+    """Yield the field values of `count` users."""
+    for number in range(start, start + count):
+        yield {
+            'username': USERNAME.format(number),
+            'email': EMAIL.format(number),
+            'first_name': 'Seed',
+            'last_name': 'User {}'.format(number),
+            'phone_number': '+52{:010d}'.format(number),
+            'is_verified': True,
+            'is_client': True,
+        }
+
+
+def generate_profiles(count, rng):
+    """Yield the field values of `count` profiles."""
+    for _ in range(count):
+        yield {
+            'biography': '',
+            'rides_taken': int(rng.paretovariate(1.5)) - 1,
+            'rides_offered': int(rng.paretovariate(1.5)) - 1,
+            'reputation': round(rng.uniform(1, 5), 2),
+        }
+
+
+def generate_circles(count, rng, start=0):
+    """Yield the field values of `count` circles."""
+    for number in range(start, start + count):
+        yield {
+            'name': 'Seed circle {}'.format(number),
+            'slug_name': SLUG_NAME.format(number),
+            'about': 'Synthetic circle number {}.'.format(number),
+            'rides_taken': int(rng.paretovariate(1.2)) - 1,
+            'rides_offered': int(rng.paretovariate(1.2)) - 1,
+            'is_public': rng.random() < 0.9,
+        }
+
+
+def generate_memberships(users_count, circles_count, rng, alpha=1.5):
+    """Yield (user index, circle index, is_admin) membership tuples.
+
+    The number of circles per user follows a Pareto distribution and
+    circles are picked with Zipf weights, so memberships pile up on a
+    few popular circles.
+    """
+    if not circles_count:
+        return
+    cum_weights = list(accumulate(1.0 / rank for rank in range(1, circles_count + 1)))
+    for user_index in range(users_count):
+        wanted = min(int(rng.paretovariate(alpha)), circles_count)
+        circles = set()
+        while len(circles) < wanted:
+            circles.add(rng.choices(range(circles_count), cum_weights=cum_weights)[0])
+        for circle_index in sorted(circles):
+            yield user_index, circle_index, rng.random() < 0.05
+
+
+def seed(users_count, circles_count, seed=0, batch_size=1000):
+    """Create the synthetic dataset through the ORM.
+
+    Every user gets PASSWORD as password. Return the number of users,
+    circles and memberships created.
+    """
+    rng = get_rng(seed)
+    password = make_password(PASSWORD)
+    start_user = User.objects.filter(username__startswith='seed_').count()
+    start_circle = Circle.objects.filter(slug_name__startswith='seed-').count()
+
+    with transaction.atomic():
+        users = [User(password=password, **values) for values in generate_users(users_count, rng, start_user)]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        user_pks = dict(User.objects.filter(
+            username__range=(users[0].username, users[-1].username)
+        ).values_list('username', 'pk')) if users else {}
+        user_pks = [user_pks[user.username] for user in users]
+
+        Profile.objects.bulk_create([
+            Profile(user_id=user_pk, **values)
+            for user_pk, values in zip(user_pks, generate_profiles(users_count, rng))
+        ], batch_size=batch_size)
+        profile_pks = dict(Profile.objects.filter(
+            user__username__range=(users[0].username, users[-1].username)
+        ).values_list('user_id', 'pk')) if users else {}
+
+        circles = [Circle(**values) for values in generate_circles(circles_count, rng, start_circle)]
+        Circle.objects.bulk_create(circles, batch_size=batch_size)
+        circle_pks = dict(Circle.objects.filter(
+            slug_name__range=(circles[0].slug_name, circles[-1].slug_name)
+        ).values_list('slug_name', 'pk')) if circles else {}
+        circle_pks = [circle_pks[circle.slug_name] for circle in circles]
+
+        memberships = 0
+        batch = []
+        for user_index, circle_index, is_admin in generate_memberships(users_count, circles_count, rng):
+            user_pk = user_pks[user_index]
+            batch.append(Membership(
+                user_id=user_pk,
+                profile_id=profile_pks[user_pk],
+                circle_id=circle_pks[circle_index],
+                is_admin=is_admin
+            ))
+            if len(batch) >= batch_size:
+                Membership.objects.bulk_create(batch)
+                memberships += len(batch)
+                batch = []
+        Membership.objects.bulk_create(batch)
+        memberships += len(batch)
+
+    bump_list_version()
+    return users_count, circles_count, memberships
+
+
+def get_partitions(count, parts):
+    """Split `count` items in up to `parts` contiguous (offset, count) slices."""
+    size, extra = divmod(count, parts)
+    offset = 0
+    for part in range(parts):
+        part_count = size + (1 if part < extra else 0)
+        if part_count:
+            yield offset, part_count
+            offset += part_count
+
+
+def copy_circles(task):
+    """Stream a slice of the circles of a bulk_seed() run into the database."""
+    seed, part, number, pk, count = task
+    rng = get_rng('{}:circles:{}'.format(seed, part))
+    with transaction.atomic():
+        bulkload.copy_instances(Circle, (
+            Circle(pk=pk + offset, **values)
+            for offset, values in enumerate(generate_circles(count, rng, number))
+        ))
+    return count
+
+
+def copy_users(task):
+    """Stream a slice of the users of a bulk_seed() run into the database.
+
+    Users, their profiles and their memberships are loaded in a single
+    transaction. Return the number of memberships created.
+    """
+    seed, part, number, user_pk, profile_pk, count, circle_pk, circles_count, password = task
+    rng = get_rng('{}:users:{}'.format(seed, part))
+    memberships = 0
+
+    def generate_membership_instances():
+        nonlocal memberships
+        for user_index, circle_index, is_admin in generate_memberships(count, circles_count, rng):
+            memberships += 1
+            yield Membership(
+                user_id=user_pk + user_index,
+                profile_id=profile_pk + user_index,
+                circle_id=circle_pk + circle_index,
+                is_admin=is_admin
+            )
+
+    with transaction.atomic():
+        bulkload.copy_instances(User, (
+            User(pk=user_pk + offset, password=password, **values)
+            for offset, values in enumerate(generate_users(count, rng, number))
+        ))
+        bulkload.copy_instances(Profile, (
+            Profile(pk=profile_pk + offset, user_id=user_pk + offset, **values)
+            for offset, values in enumerate(generate_profiles(count, rng))
+        ))
+        bulkload.copy_instances(Membership, generate_membership_instances(), with_pk=False)
+    return memberships
+
+
+def bulk_seed(users_count, circles_count, seed=0, workers=4, drop_indexes=True):
+    """Create the synthetic dataset with COPY from `workers` processes.
+
+    Every worker loads a contiguous slice of the circles, then of the
+    users with their profiles and memberships, under primary keys
+    reserved upfront from the sequences so foreign keys are known
+    without reading the rows back. Secondary indexes are dropped during the load and built
+    again in parallel afterwards. The same seed and number of workers
+    give the same dataset. Return the number of users, circles and
+    memberships created.
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError('Bulk seeding requires PostgreSQL.')
+
+    models = [User, Profile, Circle, Membership]
+    password = make_password(PASSWORD)
+    start_user = User.objects.filter(username__startswith='seed_').count()
+    start_circle = Circle.objects.filter(slug_name__startswith='seed-').count()
+    user_pk = bulkload.reserve_pks(User, users_count)
+    profile_pk = bulkload.reserve_pks(Profile, users_count)
+    circle_pk = bulkload.reserve_pks(Circle, circles_count)
+
+    circle_tasks = [
+        (seed, part, start_circle + offset, circle_pk + offset, count)
+        for part, (offset, count) in enumerate(get_partitions(circles_count, workers))
+    ]
+    user_tasks = [
+        (seed, part, start_user + offset, user_pk + offset, profile_pk + offset, count,
+         circle_pk, circles_count, password)
+        for part, (offset, count) in enumerate(get_partitions(users_count, workers))
+    ]
+
+    indexes = []
+    if drop_indexes:
+        for model in models:
+            indexes += bulkload.get_secondary_indexes(model)
+        bulkload.drop_indexes(indexes)
+
+    # Forked workers must open their own connections.
+    connections.close_all()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(copy_circles, circle_tasks))
+            memberships = sum(executor.map(copy_users, user_tasks))
+    finally:
+        if indexes:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(bulkload.create_index, [definition for _, definition in indexes]))
+
+    bulkload.analyze(models)
+    bump_list_version()
+    return users_count, circles_count, memberships
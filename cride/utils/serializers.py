@@ -0,0 +1,200 @@
+"""Serializers utilities."""
+
+# Django
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+
+# Django REST Framework
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+# Tasks
+from cride.taskapp.tasks import process_image
+
+# Utilities
+from cride.utils.counters import get_pending
+from cride.utils.images import get_variant_urls, stage_image
+from collections import OrderedDict
+
+
+def parse_fieldset(request):
+    """Return the (fields, exclude) name sets requested with ?fields= and ?exclude=, or None."""
+    fields, exclude = (
+        {name.strip() for name in request.query_params.get(param, '').split(',') if name.strip()}
+        for param in ('fields', 'exclude')
+    )
+    if not (fields or exclude):
+        return None
+    return fields, exclude
+
+
+def check_fieldset(fieldset, names):
+    """Raise a validation error (400) if the fieldset has names not in `names`."""
+    for param, requested in zip(('fields', 'exclude'), fieldset):
+        unknown = requested.difference(names)
+        if unknown:
+            raise serializers.ValidationError({
+                param: ['Unknown fields: {}.'.format(', '.join(sorted(unknown)))]
+            })
+
+
+class SparseFieldsetsSerializerMixin:
+    """Let clients pick the fields returned with ?fields= and ?exclude=.
+
+    Both take comma separated field names, unknown names are answered
+    with a 400. They only apply to the top-level serializer (or list
+    items) of safe requests with the request in the serializer context,
+    unless the context sets `sparse_fieldsets` to False; nested
+    serializers always return every field. project_queryset() restricts
+    a queryset to the columns and joins the selected fields read.
+    """
+
+    def get_fieldset(self):
+        """Return the requested (fields, exclude) name sets, or None."""
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        if not self.context.get('sparse_fieldsets', True):
+            return None
+        parent = self.parent
+        if parent is not None and not (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return None
+        return parse_fieldset(request)
+
+    def get_fieldset_key(self):
+        """Return a string identifying the requested fieldset, for cache keys."""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return ''
+        return '{}|{}'.format(','.join(sorted(fieldset[0])), ','.join(sorted(fieldset[1])))
+
+    def get_fields(self):
+        fields = super(SparseFieldsetsSerializerMixin, self).get_fields()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return fields
+        check_fieldset(fieldset, fields)
+        only, exclude = fieldset
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if (not only or name in only) and name not in exclude
+        )
+
+    def project_queryset(self, queryset, required=()):
+        """Load only the columns and joins needed by the selected fields.
+
+        `required` lists extra fields the view reads, e.g. the ordering
+        fields of a keyset paginator. The queryset is returned unchanged
+        when no fieldset was requested or a field reads something that
+        is not a model field (a property, the whole instance...).
+        """
+        if self.get_fieldset() is None:
+            return queryset
+
+        opts = queryset.model._meta
+        names = {opts.pk.name}
+        names.update(required)
+        related = []
+        for field in self.fields.values():
+            if not field.source_attrs:
+                return queryset
+            try:
+                model_field = opts.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                return queryset
+            if not model_field.is_relation:
+                names.add(model_field.name)
+                continue
+            if not (model_field.one_to_one or model_field.many_to_one):
+                return queryset
+            related.append(model_field.name)
+            if model_field.concrete:
+                names.add(model_field.name)
+            names.update(
+                '{}__{}'.format(model_field.name, related_field.name)
+                for related_field in model_field.related_model._meta.concrete_fields
+            )
+        # Joins of the relations that weren't selected are dropped.
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*names)
+
+
+class PendingCountersListSerializer(serializers.ListSerializer):
+    """Fetch the pending stat deltas of every item in a single round trip."""
+
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, 'all') else data)
+        self.pending_counters = dict(zip(
+            (instance.pk for instance in instances),
+            get_pending(instances)
+        ))
+        return super(PendingCountersListSerializer, self).to_representation(instances)
+
+
+class PendingCountersSerializerMixin:
+    """Serialize stat counters including the deltas not yet flushed.
+
+    Model serializers using it must set PendingCountersListSerializer
+    as their Meta.list_serializer_class.
+    """
+
+    def to_representation(self, instance):
+        data = super(PendingCountersSerializerMixin, self).to_representation(instance)
+        if isinstance(self.parent, PendingCountersListSerializer):
+            pending = self.parent.pending_counters.get(instance.pk, {})
+        else:
+            pending = get_pending([instance])[0]
+        for field, delta in pending.items():
+            if field in data:
+                data[field] += delta
+        return data
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the processed variants of an image field."""
+
+    def to_representation(self, value):
+        return get_variant_urls(value)
+
+
+class StagedImagesSerializerMixin:
+    """Process uploaded images in the background.
+
+    Uploads to the fields listed in `staged_image_fields` are written to
+    the staging storage instead of the model's storage, and the
+    process_image task stores them once the transaction commits.
+    """
+
+    staged_image_fields = ('picture',)
+
+    def create(self, validated_data):
+        uploads = self.pop_uploads(validated_data)
+        instance = super(StagedImagesSerializerMixin, self).create(validated_data)
+        self.stage_uploads(instance, uploads)
+        return instance
+
+    def update(self, instance, validated_data):
+        uploads = self.pop_uploads(validated_data)
+        instance = super(StagedImagesSerializerMixin, self).update(instance, validated_data)
+        self.stage_uploads(instance, uploads)
+        return instance
+
+    def pop_uploads(self, validated_data):
+        """Remove the uploaded images from the validated data."""
+        return {
+            field: validated_data.pop(field)
+            for field in self.staged_image_fields
+            if validated_data.get(field)
+        }
+
+    def stage_uploads(self, instance, uploads):
+        """Stage the uploaded images and queue their processing."""
+        for field, upload in uploads.items():
+            staged_name = stage_image(upload)
+            transaction.on_commit(
+                lambda field=field, staged_name=staged_name: process_image.delay(
+                    instance._meta.label_lower, instance.pk, field, staged_name
+                )
+            )
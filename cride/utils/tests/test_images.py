@@ -0,0 +1,143 @@
+"""Images tests."""
+
+# Django
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+# Models
+from cride.users.models import Profile, User
+
+# Tasks
+from cride.taskapp.tasks import process_image
+
+# Utilities
+from cride.utils.images import get_staging_storage, get_variant_name, process_staged_image, stage_image
+from io import BytesIO
+from PIL import Image
+from unittest import mock
+import shutil
+import tempfile
+
+
+def make_upload(size=(2000, 1000), name='picture.png'):
+    """Return an uploaded PNG image of the given size."""
+    content = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+class ImagesTestCase(TestCase):
+    """Base test case storing media and staged uploads in temporary directories."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        staging_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, staging_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_STAGING_ROOT=staging_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user(
+            email='test@cride.com',
+            username='test',
+            password='admin123',
+            is_client=True
+        )
+        self.profile = Profile.objects.create(user=user)
+
+    def get_variant_names(self, name):
+        """Return the names of every variant of a stored image."""
+        return [
+            get_variant_name(name, variant, format)
+            for variant in ('small', 'medium')
+            for format in ('jpeg', 'webp')
+        ]
+
+
+class ProcessStagedImageTestCase(ImagesTestCase):
+    """process_staged_image test case."""
+
+    def test_process(self):
+        """The image is downscaled, its variants stored and the staged file deleted."""
+        staged_name = stage_image(make_upload())
+
+        name = process_staged_image(self.profile, 'picture', staged_name)
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.picture.name, name)
+        self.assertTrue(name.startswith('users/pictures/'))
+        with default_storage.open(name) as stored:
+            self.assertEqual(Image.open(stored).size, (1600, 800))
+        for variant_name in self.get_variant_names(name):
+            self.assertTrue(default_storage.exists(variant_name))
+        self.assertFalse(get_staging_storage().exists(staged_name))
+
+    def test_previous_image_deleted(self):
+        """Replacing a picture deletes the previous one and its variants."""
+        previous = process_staged_image(self.profile, 'picture', stage_image(make_upload()))
+        self.profile.refresh_from_db()
+
+        process_staged_image(self.profile, 'picture', stage_image(make_upload()))
+
+        for name in [previous] + self.get_variant_names(previous):
+            self.assertFalse(default_storage.exists(name))
+
+    def test_failure_keeps_staged_file(self):
+        """Files stored before a failure are deleted and the upload stays staged."""
+        staged_name = stage_image(make_upload())
+        save = default_storage.save
+        saved = []
+
+        def failing_save(name, content):
+            if saved:
+                raise OSError('Storage unavailable.')
+            saved.append(save(name, content))
+            return saved[-1]
+
+        with mock.patch.object(default_storage, 'save', failing_save):
+            with self.assertRaises(OSError):
+                process_staged_image(self.profile, 'picture', staged_name)
+
+        self.assertFalse(default_storage.exists(saved[0]))
+        self.assertTrue(get_staging_storage().exists(staged_name))
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.picture)
+
+
+class ProcessImageTaskTestCase(ImagesTestCase):
+    """process_image task test case."""
+
+    def run_task(self, pk, staged_name):
+        """Run the task in process, with its retries."""
+        return process_image.apply(args=('users.profile', pk, 'picture', staged_name))
+
+    def test_retries_then_discards(self):
+        """Failures are retried and the staged file is deleted after the last retry."""
+        staged_name = stage_image(make_upload())
+        with mock.patch('cride.taskapp.tasks.process_staged_image', side_effect=OSError) as process:
+            result = self.run_task(self.profile.pk, staged_name)
+
+        self.assertTrue(result.failed())
+        self.assertEqual(process.call_count, process_image.max_retries + 1)
+        self.assertFalse(get_staging_storage().exists(staged_name))
+
+    def test_missing_instance(self):
+        """The staged file of a deleted instance is discarded."""
+        staged_name = stage_image(make_upload())
+        self.run_task(self.profile.pk + 1, staged_name)
+        self.assertFalse(get_staging_storage().exists(staged_name))
+
+    def test_already_processed(self):
+        """A redelivered task does nothing once the upload is processed."""
+        staged_name = stage_image(make_upload())
+        self.run_task(self.profile.pk, staged_name)
+        self.profile.refresh_from_db()
+        name = self.profile.picture.name
+
+        with mock.patch('cride.taskapp.tasks.process_staged_image') as process:
+            self.run_task(self.profile.pk, staged_name)
+        process.assert_not_called()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.picture.name, name)
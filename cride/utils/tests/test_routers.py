@@ -0,0 +1,133 @@
+"""Replica routing tests."""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+# Django REST Framework
+from rest_framework.authtoken.models import Token
+
+# Models
+from cride.users.models import User
+
+# Views
+from cride.circles.views.circles import CircleViewSet
+
+# Utilities
+from cride.utils.middleware import ReplicaRoutingMiddleware
+from cride.utils.routers import ReplicaRouter, use_replica
+from unittest import mock
+
+
+REPLICA = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+
+
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """Base test case configuring a second SQLite alias as the only replica."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.DATABASES, {'replica_0': REPLICA})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(use_replica, None)
+        cache.clear()
+
+
+class ReplicaRouterTestCase(ReplicaRoutingTestCase):
+    """ReplicaRouter test case."""
+
+    def test_reads_follow_the_thread_replica(self):
+        """Reads go to the replica chosen for the thread, if any."""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(User), 'default')
+        use_replica('replica_0')
+        self.assertEqual(router.db_for_read(User), 'replica_0')
+        self.assertEqual(User.objects.all().db, 'replica_0')
+
+    def test_excluded_models_read_from_primary(self):
+        """REPLICA_EXCLUDED_MODELS are always read from the primary."""
+        use_replica('replica_0')
+        self.assertEqual(ReplicaRouter().db_for_read(Token), 'default')
+
+    def test_writes_and_migrations_go_to_primary(self):
+        """Writes and migrations never reach a replica."""
+        router = ReplicaRouter()
+        use_replica('replica_0')
+        self.assertEqual(router.db_for_write(User), 'default')
+        self.assertTrue(router.allow_migrate('default', 'users'))
+        self.assertFalse(router.allow_migrate('replica_0', 'users'))
+
+    def test_cached_pages_read_from_primary(self):
+        """Circle list pages, which are cached, never come from a replica."""
+        use_replica('replica_0')
+        self.assertEqual(CircleViewSet(action='list').get_queryset().db, 'default')
+        self.assertEqual(CircleViewSet(action='retrieve').get_queryset().db, 'replica_0')
+
+
+class ReplicaRoutingMiddlewareTestCase(ReplicaRoutingTestCase):
+    """ReplicaRoutingMiddleware pinning test case."""
+
+    def setUp(self):
+        super(ReplicaRoutingMiddlewareTestCase, self).setUp()
+        self.factory = RequestFactory()
+        self.read_from = []
+
+        def get_response(request):
+            self.read_from.append(User.objects.all().db)
+            return HttpResponse(status=getattr(request, 'response_status', 200))
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def test_safe_requests_read_from_replica(self):
+        """Unpinned safe requests read from the replica."""
+        self.middleware(self.factory.get('/circles/'))
+        self.assertEqual(self.read_from, ['replica_0'])
+        # The thread goes back to the primary afterwards.
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_writes_read_from_primary(self):
+        """Writes read their own data from the primary."""
+        self.middleware(self.factory.post('/circles/'))
+        self.assertEqual(self.read_from, ['default'])
+
+    def test_write_pins_client_by_cookie(self):
+        """A write pins the client to the primary with a cookie."""
+        response = self.middleware(self.factory.post('/circles/'))
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_TIMEOUT)
+
+        request = self.factory.get('/circles/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = cookie.value
+        self.middleware(request)
+        self.assertEqual(self.read_from, ['default', 'default'])
+
+    def test_write_pins_client_by_token(self):
+        """A write pins the token to the primary, other tokens are not."""
+        headers = {'HTTP_AUTHORIZATION': 'Token 1234'}
+        self.middleware(self.factory.post('/circles/', **headers))
+
+        # No cookie sent back, the token is enough.
+        self.middleware(self.factory.get('/circles/', **headers))
+        self.assertEqual(self.read_from[-1], 'default')
+
+        self.middleware(self.factory.get('/circles/', HTTP_AUTHORIZATION='Token 5678'))
+        self.assertEqual(self.read_from[-1], 'replica_0')
+
+    def test_failed_write_does_not_pin(self):
+        """Failed writes leave the client on the replica."""
+        request = self.factory.post('/circles/', HTTP_AUTHORIZATION='Token 1234')
+        request.response_status = 400
+        response = self.middleware(request)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        self.middleware(self.factory.get('/circles/', HTTP_AUTHORIZATION='Token 1234'))
+        self.assertEqual(self.read_from[-1], 'replica_0')
+
+    def test_pin_expires(self):
+        """Pins last REPLICA_PIN_TIMEOUT seconds."""
+        headers = {'HTTP_AUTHORIZATION': 'Token 1234'}
+        with mock.patch.object(cache, 'set') as cache_set:
+            self.middleware(self.factory.post('/circles/', **headers))
+        self.assertEqual(cache_set.call_args[0][2], settings.REPLICA_PIN_TIMEOUT)
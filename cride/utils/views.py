@@ -0,0 +1,160 @@
+"""Views utilities."""
+
+# Django
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Utilities
+from cride.utils.metrics import registry
+import hashlib
+import time
+
+
+class InstrumentedViewSetMixin:
+    """Label requests with the view set action and time serialization.
+
+    Works along with RequestMetricsMiddleware, which reports the
+    collected values.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        request._request.metrics_action = '{}.{}'.format(type(self).__name__, self.action)
+        super(InstrumentedViewSetMixin, self).initial(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        return self.instrument_serializer(super(InstrumentedViewSetMixin, self).get_serializer(*args, **kwargs))
+
+    def instrument_serializer(self, serializer):
+        """Add the time spent in serializer.to_representation to the request."""
+        request = self.request._request
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            started = time.perf_counter()
+            try:
+                return to_representation(instance)
+            finally:
+                request.serialization_time = getattr(request, 'serialization_time', 0.0)
+                request.serialization_time += time.perf_counter() - started
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+
+class NotModified(Exception):
+    """Raised once a conditional request is known to be fresh."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Send weak ETag and Last-Modified validators and answer 304.
+
+    Validators are computed with a single aggregate over the action's
+    queryset: the latest `modified` of the fields in modified_lookups
+    and, for lists, the number of rows, so deletions change the ETag.
+    They are checked once authentication and permissions passed.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    modified_lookups = ('modified',)
+
+    def initial(self, request, *args, **kwargs):
+        super(ConditionalGetMixin, self).initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            self.validators = self.get_validators()
+        if self.validators is not None:
+            response = get_conditional_response(request._request, **self.validators)
+            if response is not None:
+                raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super(ConditionalGetMixin, self).handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(ConditionalGetMixin, self).finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators is not None and response.status_code in (200, 304):
+            response['ETag'] = validators['etag']
+            if validators['last_modified'] is not None:
+                response['Last-Modified'] = http_date(validators['last_modified'])
+        return response
+
+    def get_validators(self):
+        """Return the etag and last_modified of the response, or None.
+
+        None skips conditional handling, e.g. when the object does not
+        exist and the view has to answer 404.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        aggregates = {
+            'modified_{}'.format(index): Max(lookup)
+            for index, lookup in enumerate(self.modified_lookups)
+        }
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        else:
+            aggregates['count'] = Count('pk')
+        values = queryset.aggregate(**aggregates)
+
+        modified = [value for key, value in values.items() if key.startswith('modified_') and value is not None]
+        if not modified:
+            return None
+        return self.build_validators(max(modified), values.get('count'))
+
+    def build_validators(self, last_modified, *parts):
+        """Return the validators of a response as get_conditional_response takes them.
+
+        The ETag also covers the full path, as the query string (cursor,
+        page size...) changes the representation.
+        """
+        seed = [self.request._request.get_full_path()]
+        if last_modified is not None:
+            seed.append(last_modified.isoformat())
+        seed.extend(str(part) for part in parts)
+        digest = hashlib.sha1('|'.join(seed).encode()).hexdigest()
+        return {
+            'etag': 'W/' + quote_etag(digest),
+            'last_modified': int(last_modified.timestamp()) if last_modified is not None else None,
+        }
+
+
+class SparseFieldsetsViewMixin:
+    """Project the querysets of safe requests on the requested fields.
+
+    Works along with SparseFieldsetsSerializerMixin: the queryset is
+    restricted with the serializer's project_queryset() after the
+    filter backends ran.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super(SparseFieldsetsViewMixin, self).filter_queryset(queryset)
+        serializer = self.get_serializer()
+        if not hasattr(serializer, 'project_queryset'):
+            return queryset
+        return serializer.project_queryset(queryset, self.get_required_fields())
+
+    def get_required_fields(self):
+        """Return the model fields the view reads besides the serialized ones."""
+        fields = [self.lookup_field]
+        ordering = getattr(self.paginator, 'ordering', None) if self.action == 'list' else None
+        fields.extend(field.lstrip('-') for field in ordering or ())
+        return fields
+
+
+def metrics(request):
+    """Expose the process metrics in the Prometheus text format.
+
+    Only available to the addresses in METRICS_ALLOWED_IPS.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4')